@@ -22,27 +22,576 @@ This module provides the base implementation for pyRFXtrx
 """
 # pylint: disable=R0903
 
+import threading
+import time
+from collections import deque
+
 from RFXtrx import lowlevel
 
+_now = getattr(time, 'monotonic', time.time)
+
 
 ###############################################################################
 # RFXtrxTransport class
 ###############################################################################
 
+def parse(data):
+    """ Parse the given data and return an RFXtrxEvent, without any of the
+        options of a transport, like RFXtrxTransport.parse() did before it
+        became a method of the transport
+    """
+    pkt = lowlevel.parse(data)
+    if pkt is None:
+        return None
+    return _create_event(pkt)
+
+
 class RFXtrxTransport(object):
-    """ Abstract superclass for all transport mechanisms """
+    """ Abstract superclass for all transport mechanisms
 
-    @staticmethod
-    def parse(data):
-        """ Parse the given data and return an RFXtrxEvent """
-        pkt = lowlevel.parse(data)
-        if pkt is not None:
-            if isinstance(pkt, lowlevel.SensorPacket):
-                return SensorEvent(pkt)
-            elif isinstance(pkt, lowlevel.Status):
-                return StatusEvent(pkt)
+        The options are class attributes that can be set per transport. The
+        state of a transport is created by __new__(), so that transports
+        that do not call RFXtrxTransport.__init__() have it as well.
+    """
+
+    # see parse()
+    reuse_objects = False
+    dedupe_window = None
+    duplicates = 0
+    track_state = False
+    max_states = 4096
+    changes_only = False
+    heartbeat = None
+    unchanged = 0
+    # see transmit()
+    max_pending = None
+    transmit_timeout = 5
+    coalesced = 0
+    _seqnbr = 0
+    _expiry_deadline = None
+    # see send_many()
+    write_limit = 64
+    write_window = None
+
+    def __new__(cls, *args, **kwargs):  # pylint: disable=W0613
+        self = super(RFXtrxTransport, cls).__new__(cls)
+        # see parse(), and rejected, which counts the frames rejected by
+        # lowlevel.parse() and StreamFramer by reason
+        self._packets = {}
+        self._events = {}
+        self.rejected = dict.fromkeys(lowlevel.REJECT_REASONS, 0)
+        self._recent = {}
+        self.states = {}
+        self.tolerances = {'Rssi numeric': None}
+        self._emitted = {}
+        # subscriptions by device_key, by (packettype, subtype), by
+        # (packettype, None) and by None for all events, see subscribe()
+        self._subscribers = {}
+        # see transmit()
+        self._transmissions = {}
+        self._queued = deque()
+        self._queued_keys = {}
+        self._transmit_lock = threading.Lock()
+        # see send_many()
+        self._write_buffer = bytearray()
+        self._write_lock = threading.Lock()
+        return self
+
+    def parse(self, data):
+        """ Parse the given data and return an RFXtrxEvent
+
+            When reuse_objects is set, one packet and event instance is kept
+            per packettype, and every received frame is loaded into those
+            instead of into newly allocated objects. An event (including its
+            values) is then only valid until the next frame is parsed: for
+            the blocking transports that is the next call to
+            receive_blocking(), for callback based transports it is when the
+            callback returns. Consumers that keep an event or a values dict
+            beyond that point must copy what they need. The device of an
+            event is not reused for other devices, and can be kept.
+
+            Most transmitters send every message several times. When
+            dedupe_window is set to a number of seconds, a frame that repeats
+            the previous frame of the same device within that time, apart
+            from seqnbr and rssi, is counted in duplicates and None is
+            returned instead of an event.
+
+            When track_state is set, the states dict maps every device that
+            sent a frame to its DeviceState, which is updated in place with
+            the values of each event from that device. When it holds
+            max_states devices, the states of the devices that sent only one
+            frame, which are mostly noise decoded as random ids, are dropped
+            before another device is added, or all states if there are none.
+
+            When changes_only is set, a SensorEvent is only returned if its
+            values differ from those of the last event returned for the same
+            device, or if heartbeat (a number of seconds, if set) has passed
+            since then. Otherwise it is counted in unchanged and None is
+            returned. Control events are always returned, as a command is
+            meant to be acted on even if it repeats the previous one.
+            tolerances maps value names to the largest difference that is
+            not counted as a change, or to None to ignore that value, like
+            the rssi by default.
+
+            Returned events are also passed to the matching subscribers, see
+            subscribe(). A TransmitterResponse also completes the pending
+            Transmission with its seqnbr, see transmit().
+        """
+        if self.reuse_objects:
+            pkt = lowlevel.parse(data, packets=self._packets,
+                                 rejected=self.rejected)
+        else:
+            pkt = lowlevel.parse(data, rejected=self.rejected)
+        if pkt is None:
+            return None
+        if pkt.packettype == 0x02 and self._transmissions:
+            self._complete_transmission(pkt)
+        if self._queued:
+            for transmission in self._next_transmissions():
+                self._send_transmission(transmission)
+        if self.dedupe_window is not None and self._is_duplicate(pkt):
+            self.duplicates += 1
+            return None
+        if not self.reuse_objects:
+            event = _create_event(pkt)
+        else:
+            event = self._events.get(pkt.packettype)
+            if event is None:
+                event = self._events[pkt.packettype] = _create_event(pkt)
             else:
-                return ControlEvent(pkt)
+                event._load(pkt)  # pylint: disable=W0212
+        if self.track_state and pkt.packettype >= 0x10:
+            self._update_state(event)
+        if self.changes_only and isinstance(event, SensorEvent) \
+                and self._is_unchanged(event):
+            self.unchanged += 1
+            return None
+        if self._subscribers:
+            self._dispatch(event)
+        return event
+
+    def subscribe(self, callback, device=None, packettype=None, subtype=None):
+        """ Call callback with every event of the given device, or else with
+            every event of the given packettype (and subtype, if given), or
+            else with every event. Return a Subscription to pass to
+            unsubscribe()
+
+            Subscribers are found through dict lookups, so the time spent
+            per event depends on the number of matching subscriptions only.
+            Callbacks for a device are called first, then those for the
+            packettype and subtype, then those for the packettype and then
+            those for all events.
+        """
+        if device is not None:
+            key = device.device_key
+        elif packettype is not None:
+            key = (packettype, subtype)
+        elif subtype is not None:
+            raise ValueError("Subtype without packettype")
+        else:
+            key = None
+        subscription = Subscription(key, callback)
+        self._subscribers.setdefault(key, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """ Stop calling the callback of the given subscription """
+        subscriptions = self._subscribers[subscription.key]
+        subscriptions.remove(subscription)
+        if not subscriptions:
+            del self._subscribers[subscription.key]
+
+    def send(self, data):
+        """ Send the given packet, see send_many() for write_window """
+        if isinstance(data, (bytearray, memoryview)):
+            pkt = data
+        elif isinstance(data, str) or isinstance(data, bytes):
+            pkt = bytearray(data)
+        else:
+            raise ValueError("Invalid type")
+        if self.write_window is not None:
+            self._buffer_write(pkt)
+        else:
+            self._write(pkt)
+
+    def send_many(self, frames):
+        """ Send the given packets, joined into as few writes as possible.
+            A write holds at most write_limit bytes (one USB full speed
+            packet by default, which the RFXtrx input buffer can take at
+            once), and a packet is never split over writes.
+
+            When write_window is set to a number of seconds, send() does not
+            write a packet immediately, but buffers it for at most that time
+            and writes it together with the packets sent in the meantime,
+            in writes of at most write_limit bytes as well. flush() writes
+            the buffered packets immediately.
+        """
+        limit = self.write_limit
+        with self._write_lock:
+            # the packets buffered by send() go first
+            chunk, self._write_buffer = self._write_buffer, bytearray()
+            for frame in frames:
+                if chunk and len(chunk) + len(frame) > limit:
+                    self._write(chunk)
+                    chunk = bytearray()
+                chunk += frame
+            if chunk:
+                self._write(chunk)
+
+    def flush(self):
+        """ Write the packets buffered by send(), see send_many() """
+        with self._write_lock:
+            buffer, self._write_buffer = self._write_buffer, bytearray()
+            if buffer:
+                self._write(buffer)
+
+    def _buffer_write(self, pkt):
+        """ Buffer pkt for writing within write_window, see send_many() """
+        with self._write_lock:
+            buffer = self._write_buffer
+            if buffer and len(buffer) + len(pkt) > self.write_limit:
+                self._write(buffer)
+                self._write_buffer = buffer = bytearray()
+            if not buffer:
+                self._call_later(self.write_window, self.flush)
+            buffer += pkt
+
+    def _write(self, data):
+        """ Write data to the RFXtrx, implemented by the transports. For
+            transports that only implement send(), data is passed to it
+        """
+        if type(self).send == RFXtrxTransport.send:
+            raise NotImplementedError
+        self.send(data)
+
+    def _call_later(self, delay, function):
+        """ Call function from a timer thread after delay seconds.
+            Transports with an event loop call it from that loop instead
+        """
+        timer = threading.Timer(delay, function)
+        timer.daemon = True
+        timer.start()
+
+    def transmit(self, data, callback=None, key=None, prepare=None):
+        """ Send the packet in data with the next seqnbr, and return a
+            Transmission that is completed when the RFXtrx responds with a
+            TransmitterResponse with that seqnbr. If given, callback is
+            called with the Transmission when it completes, and prepare is
+            called with the packet right before it is sent, to fill in
+            fields like the cmndseqnbr of Lighting6.
+
+            When max_pending is set, no more than that many transmissions
+            wait for their response at the same time, and the others are
+            queued. A transmission that gets no response within
+            transmit_timeout seconds is completed without a response, and
+            no longer counts as pending, see _expire_transmissions(). A
+            queued transmission is superseded by a later one with the same
+            key (like the device_key of the device the command is for): it
+            is completed without being sent, and counted in coalesced. As
+            transmissions are only queued when max_pending is set, they are
+            only superseded then; by default every one is sent immediately.
+        """
+        transmission = self._queue_transmission(data, callback, key, prepare)
+        for queued in self._next_transmissions():
+            self.send(queued.data)
+        return transmission
+
+    def _queue_transmission(self, data, callback, key, prepare=None):
+        """ Queue and return a Transmission for data """
+        transmission = Transmission(bytearray(data))
+        if callback is not None:
+            transmission.add_callback(callback)
+        transmission._prepare = prepare  # pylint: disable=W0212
+        superseded = None
+        with self._transmit_lock:
+            if key is not None:
+                superseded = self._queued_keys.get(key)
+                if superseded is not None:
+                    self.coalesced += 1
+                self._queued_keys[key] = transmission
+            transmission.key = key
+            self._queued.append(transmission)
+        if superseded is not None:
+            superseded.superseded = True
+            superseded._complete(None)  # pylint: disable=W0212
+        return transmission
+
+    def _next_transmissions(self):
+        """ Give the queued transmissions that can be sent now the next
+            seqnbr, and return them
+        """
+        started = []
+        expired = []
+        now = _now()
+        with self._transmit_lock:
+            queued = self._queued
+            pending = self._transmissions
+            while queued and (self.max_pending is None
+                              or len(pending) < self.max_pending):
+                transmission = queued.popleft()
+                if transmission.superseded:
+                    continue
+                if transmission.key is not None:
+                    del self._queued_keys[transmission.key]
+                # seqnbr 0 is left for packets sent without transmit()
+                self._seqnbr = seqnbr = self._seqnbr % 0xff + 1
+                transmission.seqnbr = seqnbr
+                transmission.data[3] = seqnbr
+                transmission.sent = now
+                previous = pending.get(seqnbr)
+                if previous is not None:
+                    # no response received before the seqnbr was reused
+                    expired.append(previous)
+                pending[seqnbr] = transmission
+                started.append(transmission)
+            deadline = None
+            if started and self.transmit_timeout is not None:
+                deadline = now + self.transmit_timeout
+                if self._expiry_deadline is not None \
+                        and self._expiry_deadline <= deadline:
+                    deadline = None
+                else:
+                    self._expiry_deadline = deadline
+        for transmission in expired:
+            transmission._complete(None)  # pylint: disable=W0212
+        if deadline is not None:
+            self._schedule_expiry(deadline, now)
+        for transmission in started:
+            prepare = transmission._prepare  # pylint: disable=W0212
+            if prepare is not None:
+                prepare(transmission.data)
+        return started
+
+    def _schedule_expiry(self, deadline, now):
+        """ Call _expire_transmissions() at deadline """
+        self._call_later(max(deadline - now, 0),
+                         lambda: self._expire_transmissions(deadline))
+
+    def _expire_transmissions(self, scheduled):
+        """ Complete the pending transmissions that got no response within
+            transmit_timeout seconds. Scheduled with _call_later() for the
+            deadline of the oldest pending transmission, when one is sent
+            that expires before the deadline scheduled so far
+        """
+        expired = []
+        deadline = None
+        now = _now()
+        with self._transmit_lock:
+            if self._expiry_deadline == scheduled:
+                self._expiry_deadline = None
+            timeout = self.transmit_timeout
+            pending = self._transmissions
+            if timeout is not None and pending:
+                for seqnbr, transmission in list(pending.items()):
+                    if transmission.sent + timeout <= now:
+                        expired.append(pending.pop(seqnbr))
+                if pending:
+                    deadline = min(t.sent for t in pending.values()) + timeout
+                    if self._expiry_deadline is not None \
+                            and self._expiry_deadline <= deadline:
+                        deadline = None
+                    else:
+                        self._expiry_deadline = deadline
+        for transmission in expired:
+            transmission._complete(None)  # pylint: disable=W0212
+        if deadline is not None:
+            self._schedule_expiry(deadline, now)
+        if expired and self._queued:
+            # the expired transmissions no longer hold back queued ones
+            for transmission in self._next_transmissions():
+                self._send_transmission(transmission)
+
+    def _send_transmission(self, transmission):
+        """ Send a queued transmission from parse() or
+            _expire_transmissions()
+        """
+        self.send(transmission.data)
+
+    def _complete_transmission(self, pkt):
+        """ Complete the Transmission that pkt is the response to """
+        with self._transmit_lock:
+            transmission = self._transmissions.pop(pkt.seqnbr, None)
+        if transmission is not None:
+            # pkt is copied, as it may be reused, see reuse_objects
+            response = lowlevel.TransmitterResponse()
+            response.load_receive(pkt.data)
+            transmission._complete(response)  # pylint: disable=W0212
+
+    def _dispatch(self, event):
+        """ Pass event to the callbacks of the matching subscriptions """
+        subscribers = self._subscribers
+        device = event.device
+        for key in (device.device_key, (device.packettype, device.subtype),
+                    (device.packettype, None), None):
+            subscriptions = subscribers.get(key)
+            if subscriptions:
+                # copy, callbacks may unsubscribe
+                for subscription in tuple(subscriptions):
+                    subscription.callback(event)
+
+    def _is_unchanged(self, event):
+        """ Return whether the values of event are the same as those last
+            returned for its device and the heartbeat has not passed yet, and
+            remember them otherwise
+        """
+        values = event.values
+        now = _now()
+        key = event.device.device_key
+        last = self._emitted.get(key)
+        heartbeat = self.heartbeat
+        if last is not None \
+                and (heartbeat is None or now - last[1] < heartbeat) \
+                and _same_values(values, last[0], self.tolerances):
+            return True
+        if last is None and len(self._emitted) >= _RECENT_SIZE:
+            self._emitted.clear()
+        self._emitted[key] = (dict(values), now)
+        return False
+
+    def _update_state(self, event):
+        """ Update the state of the device of event with its values """
+        device = event.device
+        states = self.states
+        state = states.get(device)
+        if state is None:
+            if len(states) >= self.max_states:
+                _prune_states(states)
+            state = states[device] = DeviceState(device)
+        state.values.update(event.values)
+        state.last_seen = time.time()
+        state.rssi = event.pkt.rssi
+        state.count += 1
+
+    def get_state(self, device):
+        """ Return the DeviceState of device, or None if no frame from it has
+            been received while track_state was set
+        """
+        return self.states.get(device)
+
+    def _is_duplicate(self, pkt):
+        """ Return whether pkt repeats the previous frame of its device within
+            dedupe_window, and remember it otherwise
+        """
+        if pkt.packettype < 0x10:
+            # responses of the RFXtrx itself are never repeated transmissions
+            return False
+        fingerprint = _fingerprint(pkt._frame())  # pylint: disable=W0212
+        now = _now()
+        key = pkt.device_key
+        recent = self._recent.get(key)
+        if recent is not None and recent[0] == fingerprint \
+                and now - recent[1] < self.dedupe_window:
+            return True
+        if recent is None and len(self._recent) >= _RECENT_SIZE:
+            self._recent.clear()
+        self._recent[key] = (fingerprint, now)
+        return False
+
+
+class _FramedTransport(RFXtrxTransport):
+    """ Superclass of the transports that read a byte stream, which is split
+        into frames by a StreamFramer and queued in frames
+    """
+
+    def __init__(self):
+        super(_FramedTransport, self).__init__()
+        self.framer = lowlevel.StreamFramer(self.rejected)
+        self.frames = deque()
+
+    def _read_frames(self):
+        """ Wait for data, and return the frames it completes, implemented
+            by the transports
+        """
+        raise NotImplementedError
+
+    def receive_blocking(self):
+        """ Wait until a packet is received and return with an RFXtrxEvent """
+        while True:
+            while not self.frames:
+                self.frames.extend(self._read_frames())
+            pkt = self.frames.popleft()
+            if self.debug:
+                print("Recv: " + " ".join("0x{0:02x}".format(x) for x in pkt))
+            event = self.parse(pkt)
+            if event is not None:
+                return event
+
+
+# Maximum number of devices RFXtrxTransport._is_duplicate() and
+# RFXtrxTransport._is_unchanged() remember
+_RECENT_SIZE = 4096
+
+
+def _prune_states(states):
+    """ Drop the states of the devices that sent only one frame, or all
+        states if there are none
+    """
+    single = [device for device, state in states.items() if state.count <= 1]
+    if single:
+        for device in single:
+            del states[device]
+    else:
+        states.clear()
+
+
+def _fingerprint(data):
+    """ Return a hash of the frame in data that is the same for repeated
+        transmissions of a message, and for receptions by other receivers
+    """
+    # leave out seqnbr, and the rssi in the high nibble of the last byte
+    return hash((data[2], bytes(data[4:-1]), data[-1] & 0x0f))
+
+
+def _same_values(values, previous, tolerances):
+    """ Return whether the values dicts are the same, within tolerances """
+    if len(values) != len(previous):
+        return False
+    for name, value in values.items():
+        if name not in previous:
+            return False
+        old = previous[name]
+        tolerance = tolerances.get(name, 0)
+        if tolerance is None or value == old:
+            continue
+        # allow for rounding errors, the difference between 21.3 and 21.2
+        # is a bit more than 0.1
+        if not tolerance or value is None or old is None \
+                or abs(value - old) - tolerance > 1e-9:
+            return False
+    return True
+
+
+# Devices by device_key, so that all events from the same transmitter share
+# one device object. Cleared when full, to bound memory use when noise is
+# received as frames with random ids.
+_DEVICES = {}
+_DEVICES_SIZE = 4096
+
+# Devices returned by get_device(), by its arguments
+_DEVICES_BY_ID = {}
+
+
+def _get_shared_device(pkt, cls):
+    """ Return the device of the given class for the transmitter of pkt """
+    key = pkt.device_key
+    device = _DEVICES.get(key)
+    if device is None:
+        if len(_DEVICES) >= _DEVICES_SIZE:
+            _DEVICES.clear()
+            _DEVICES_BY_ID.clear()
+        device = _DEVICES[key] = cls(pkt)
+    return device
+
+
+def _create_event(pkt):
+    """ Return a new RFXtrxEvent for the given packet """
+    if isinstance(pkt, lowlevel.SensorPacket):
+        return SensorEvent(pkt)
+    elif isinstance(pkt, lowlevel.Status) \
+            or isinstance(pkt, lowlevel.TransmitterResponse):
+        return StatusEvent(pkt)
+    else:
+        return ControlEvent(pkt)
 
 
 ###############################################################################
@@ -52,18 +601,28 @@ class RFXtrxTransport(object):
 class RFXtrxDevice(object):
     """ Superclass for all devices """
 
+    __slots__ = ('packettype', 'subtype', 'type_string', 'id_string',
+                 'device_key')
+
     def __init__(self, pkt):
+        self._load(pkt)
+
+    def _load(self, pkt):
+        """ Load the identifying values of the device from pkt """
         self.packettype = pkt.packettype
         self.subtype = pkt.subtype
         self.type_string = pkt.type_string
         self.id_string = pkt.id_string
+        self.device_key = pkt.device_key
 
     def __eq__(self, other):
-        if self.packettype != other.packettype:
-            return False
-        if self.subtype != other.subtype:
-            return False
-        return self.id_string == other.id_string
+        return self.device_key == other.device_key
+
+    def __ne__(self, other):
+        return self.device_key != other.device_key
+
+    def __hash__(self):
+        return hash(self.device_key)
 
     def __str__(self):
         return "{0} type='{1}' id='{2}'".format(
@@ -77,8 +636,18 @@ class RFXtrxDevice(object):
 class LightingDevice(RFXtrxDevice):
     """ Concrete class for a lighting device """
 
+    # Only the attributes that apply to the packettype of the device are set
+    __slots__ = ('housecode', 'unitcode', 'id_combined', 'system', 'channel',
+                 'groupcode', 'cmndseqnbr')
+
     def __init__(self, pkt):
         super(LightingDevice, self).__init__(pkt)
+        if isinstance(pkt, lowlevel.Lighting6):
+            self.cmndseqnbr = 0
+
+    def _load(self, pkt):
+        """ Load the identifying values of the device from pkt """
+        super(LightingDevice, self)._load(pkt)
         if isinstance(pkt, lowlevel.Lighting1):
             self.housecode = pkt.housecode
             self.unitcode = pkt.unitcode
@@ -95,50 +664,76 @@ class LightingDevice(RFXtrxDevice):
             self.id_combined = pkt.id_combined
             self.groupcode = pkt.groupcode
             self.unitcode = pkt.unitcode
-            self.cmndseqnbr = 0
 
-    def send_onoff(self, transport, on):
-        """ Send an 'On' or 'Off' command using the given transport """
+    def _send(self, transport, data, track, prepare=None):
+        """ Send data with transport.send(), or if track is set with
+            transport.transmit(), and return the result. prepare is called
+            with data right before it is sent, see transmit()
+        """
+        if track:
+            return transport.transmit(data, key=self.device_key,
+                                      prepare=prepare)
+        if prepare is not None:
+            prepare(data)
+        return transport.send(data)
+
+    def _next_cmndseqnbr(self, data):
+        """ Write the next cmndseqnbr of a Lighting6 device into data """
+        data[9] = self.cmndseqnbr
+        self.cmndseqnbr = (self.cmndseqnbr + 1) % 5
+
+    def send_onoff(self, transport, on, track=False):
+        """ Send an 'On' or 'Off' command using the given transport. If
+            track is set, the command is sent with transport.transmit(), and
+            its Transmission is returned, see RFXtrxTransport.transmit().
+            On an AsyncioSerialTransport, the result must be awaited
+        """
         if self.packettype == 0x10:  # Lighting1
             pkt = lowlevel.Lighting1()
             pkt.set_transmit(self.subtype, 0, self.housecode, self.unitcode,
                              on and 0x01 or 0x00)
-            transport.send(pkt.data)
+            return self._send(transport, pkt.data, track)
         elif self.packettype == 0x11:  # Lighting2
             pkt = lowlevel.Lighting2()
             pkt.set_transmit(self.subtype, 0, self.id_combined, self.unitcode,
                              on and 0x01 or 0x00, 0x00)
-            transport.send(pkt.data)
+            return self._send(transport, pkt.data, track)
         elif self.packettype == 0x12:  # Lighting3
             pkt = lowlevel.Lighting3()
             pkt.set_transmit(self.subtype, 0, self.system, self.channel,
                              on and 0x10 or 0x1a)
-            transport.send(pkt.data)
+            return self._send(transport, pkt.data, track)
         elif self.packettype == 0x14:  # Lighting5
             pkt = lowlevel.Lighting5()
             pkt.set_transmit(self.subtype, 0, self.id_combined, self.unitcode,
                              on and 0x01 or 0x00, 0x00)
-            transport.send(pkt.data)
+            return self._send(transport, pkt.data, track)
         elif self.packettype == 0x15:  # Lighting6
             pkt = lowlevel.Lighting6()
+            # cmndseqnbr is set when the packet is sent, as a tracked command
+            # may be superseded before that
             pkt.set_transmit(self.subtype, 0, self.id_combined, self.groupcode,
-                             self.unitcode, not on and 0x01 or 0x00, self.cmndseqnbr)
-            self.cmndseqnbr = (self.cmndseqnbr + 1) % 5
-            transport.send(pkt.data)
+                             self.unitcode, not on and 0x01 or 0x00, 0)
+            return self._send(transport, pkt.data, track,
+                              self._next_cmndseqnbr)
         else:
             raise ValueError("Unsupported packettype")
 
-    def send_on(self, transport):
-        """ Send an 'On' command using the given transport """
-        self.send_onoff(transport, True)
+    def send_on(self, transport, track=False):
+        """ Send an 'On' command using the given transport, see
+            send_onoff() for track
+        """
+        return self.send_onoff(transport, True, track)
 
-    def send_off(self, transport):
-        """ Send an 'Off' command using the given transport """
-        self.send_onoff(transport, False)
+    def send_off(self, transport, track=False):
+        """ Send an 'Off' command using the given transport, see
+            send_onoff() for track
+        """
+        return self.send_onoff(transport, False, track)
 
-    def send_dim(self, transport, level):
+    def send_dim(self, transport, level, track=False):
         """ Send a 'Dim' command with the given level using the given
-            transport
+            transport, see send_onoff() for track
         """
         if self.packettype == 0x10:  # Lighting1
             raise ValueError("Dim level unsupported for Lighting1")
@@ -146,13 +741,13 @@ class LightingDevice(RFXtrxDevice):
             # RFXtrx does not support sending extended commands
         elif self.packettype == 0x11:  # Lighting2
             if level == 0:
-                self.send_off(transport)
+                return self.send_off(transport, track)
             else:
                 pkt = lowlevel.Lighting2()
                 pkt.set_transmit(self.subtype, 0, self.id_combined,
                                  self.unitcode, 0x02,
                                  ((level + 6) * 16 // 100) - 1)
-                transport.send(pkt.data)
+                return self._send(transport, pkt.data, track)
         elif self.packettype == 0x12:  # Lighting3
             raise ValueError("Dim level unsupported for Lighting3")
             # Should not be too hard to add dim level support for Lighting3
@@ -161,13 +756,13 @@ class LightingDevice(RFXtrxDevice):
             # between a percentage and a level
         elif self.packettype == 0x14:  # Lighting5
             if level == 0:
-                self.send_off(transport)
+                return self.send_off(transport, track)
             else:
                 pkt = lowlevel.Lighting5()
                 pkt.set_transmit(self.subtype, 0, self.id_combined,
                                  self.unitcode, 0x10,
                                  ((level + 3) * 32 // 100) - 1)
-                transport.send(pkt.data)
+                return self._send(transport, pkt.data, track)
         elif self.packettype == 0x15:  # Lighting6
             raise ValueError("Dim level unsupported for Lighting6")
         else:
@@ -179,31 +774,289 @@ class LightingDevice(RFXtrxDevice):
 ###############################################################################
 
 def get_device(packettype, subtype, id_string):
-    """ Return a device base on its identifying values """
+    """ Return a device base on its identifying values
+
+        The same device object is returned for the same values, and for
+        events received from that device.
+    """
+    args = (packettype, subtype, id_string)
+    device = _DEVICES_BY_ID.get(args)
+    if device is None:
+        device = _DEVICES_BY_ID[args] = _get_shared_device(
+            _parse_device_id(packettype, subtype, id_string), LightingDevice)
+    return device
+
+
+def _parse_device_id(packettype, subtype, id_string):
+    """ Return a packet with the identifying values of a device """
     if packettype == 0x10:  # Lighting1
         pkt = lowlevel.Lighting1()
         pkt.parse_id(subtype, id_string)
-        return LightingDevice(pkt)
+        return pkt
     elif packettype == 0x11:  # Lighting2
         pkt = lowlevel.Lighting2()
         pkt.parse_id(subtype, id_string)
-        return LightingDevice(pkt)
+        return pkt
     elif packettype == 0x12:  # Lighting3
         pkt = lowlevel.Lighting3()
         pkt.parse_id(subtype, id_string)
-        return LightingDevice(pkt)
+        return pkt
     elif packettype == 0x14:  # Lighting5
         pkt = lowlevel.Lighting5()
         pkt.parse_id(subtype, id_string)
-        return LightingDevice(pkt)
+        return pkt
     elif packettype == 0x15:  # Lighting6
         pkt = lowlevel.Lighting6()
         pkt.parse_id(subtype, id_string)
-        return LightingDevice(pkt)
+        return pkt
     else:
         raise ValueError("Unsupported packettype")
 
 
+###############################################################################
+# DeviceState class
+###############################################################################
+
+class DeviceState(object):
+    """ Last known state of a device, kept by RFXtrxTransport
+
+        values holds the most recent value received for each name, last_seen
+        the time.time() of the last frame, rssi its signal level and count
+        the number of frames received.
+    """
+
+    __slots__ = ('device', 'values', 'last_seen', 'rssi', 'count')
+
+    def __init__(self, device):
+        self.device = device
+        self.values = {}
+        self.last_seen = None
+        self.rssi = None
+        self.count = 0
+
+    def __str__(self):
+        return "{0} device=[{1}] rssi={2} count={3} values={4}".format(
+            type(self), self.device, self.rssi, self.count,
+            sorted(self.values.items()))
+
+
+###############################################################################
+# Subscription class
+###############################################################################
+
+class Subscription(object):
+    """ Subscription to events, returned by RFXtrxTransport.subscribe() """
+
+    __slots__ = ('key', 'callback')
+
+    def __init__(self, key, callback):
+        self.key = key
+        self.callback = callback
+
+
+###############################################################################
+# Transmission class
+###############################################################################
+
+class Transmission(object):
+    """ A packet sent with RFXtrxTransport.transmit()
+
+        Once the RFXtrx has responded, done is set, response holds the
+        TransmitterResponse, ack whether the command was transmitted and
+        latency the number of seconds between sending the packet and
+        receiving the response. If no response was received before the
+        seqnbr was reused or transmit_timeout passed, or if the transmission
+        was superseded while queued, done is set while response is None.
+        seqnbr and sent are None until the packet is sent.
+    """
+
+    __slots__ = ('seqnbr', 'data', 'key', 'sent', 'response', 'latency',
+                 'done', 'superseded', '_callbacks', '_event', '_prepare')
+
+    def __init__(self, data):
+        self.seqnbr = None
+        self.data = data
+        self.key = None
+        self.sent = None
+        self.response = None
+        self.latency = None
+        self.done = False
+        self.superseded = False
+        self._callbacks = []
+        self._event = threading.Event()
+        self._prepare = None
+
+    @property
+    def ack(self):
+        """ Whether the RFXtrx has transmitted the packet """
+        return self.response is not None and self.response.ack
+
+    def add_callback(self, callback):
+        """ Call callback with this Transmission when it is done, or now if
+            it already is
+        """
+        if self.done:
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    def wait(self, timeout=None):
+        """ Wait until the Transmission is done, or timeout seconds have
+            passed if given, and return done
+        """
+        self._event.wait(timeout)
+        return self.done
+
+    def _complete(self, response):
+        """ Complete the transmission with the given response """
+        if response is not None:
+            self.latency = _now() - self.sent
+        self.response = response
+        self.done = True
+        self._event.set()
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def __str__(self):
+        return "{0} seqnbr={1} done={2} ack={3} superseded={4}".format(
+            type(self), self.seqnbr, self.done, self.ack, self.superseded)
+
+
+###############################################################################
+# Value extractors
+###############################################################################
+
+def _get_extractor(extractors, cls):
+    """ Return the function from extractors that fills the values dict of
+        a packet of class cls, looking at the base classes of cls if needed
+    """
+    extractor = extractors.get(cls)
+    if extractor is None:
+        for base in cls.__mro__:
+            if base in extractors:
+                extractor = extractors[cls] = extractors[base]
+                break
+    return extractor
+
+
+def _temp_values(pkt, values):
+    """ Values of a Temp packet """
+    values['Temperature'] = pkt.temp
+    values['Battery numeric'] = pkt.battery
+    values['Rssi numeric'] = pkt.rssi
+
+
+def _humid_values(pkt, values):
+    """ Values of a Humid packet """
+    values['Humidity'] = pkt.humidity
+    values['Humidity status'] = pkt.humidity_status_string
+    values['Humidity status numeric'] = pkt.humidity_status
+    values['Battery numeric'] = pkt.battery
+    values['Rssi numeric'] = pkt.rssi
+
+
+def _temphumid_values(pkt, values):
+    """ Values of a TempHumid packet """
+    values['Temperature'] = pkt.temp
+    values['Humidity'] = pkt.humidity
+    values['Humidity status'] = pkt.humidity_status_string
+    values['Humidity status numeric'] = pkt.humidity_status
+    values['Battery numeric'] = pkt.battery
+    values['Rssi numeric'] = pkt.rssi
+
+
+def _baro_values(pkt, values):
+    """ Values of a Baro packet """
+    values['Barometer'] = pkt.baro
+    values['Forecast'] = pkt.forecast_string
+    values['Forecast numeric'] = pkt.forecast
+    values['Battery numeric'] = pkt.battery
+    values['Rssi numeric'] = pkt.rssi
+
+
+def _temphumidbaro_values(pkt, values):
+    """ Values of a TempHumidBaro packet """
+    values['Temperature'] = pkt.temp
+    values['Humidity'] = pkt.humidity
+    values['Humidity status'] = pkt.humidity_status_string
+    values['Humidity status numeric'] = pkt.humidity_status
+    values['Barometer'] = pkt.baro
+    values['Forecast'] = pkt.forecast_string
+    values['Forecast numeric'] = pkt.forecast
+    values['Battery numeric'] = pkt.battery
+    values['Rssi numeric'] = pkt.rssi
+
+
+def _rain_values(pkt, values):
+    """ Values of a Rain packet """
+    values['Rain rate'] = pkt.rainrate
+    values['Rain total'] = pkt.raintotal
+    values['Battery numeric'] = pkt.battery
+    values['Rssi numeric'] = pkt.rssi
+
+
+def _wind_values(pkt, values):
+    """ Values of a Wind packet """
+    values['Wind direction'] = pkt.direction
+    values['Wind average speed'] = pkt.average_speed
+    values['Wind gust'] = pkt.gust
+    values['Temperature'] = pkt.temperature
+    values['Chill'] = pkt.chill
+    values['Battery numeric'] = pkt.battery
+    values['Rssi numeric'] = pkt.rssi
+
+
+def _sensor_values(pkt, values):
+    """ Values of any other sensor packet """
+    values['Battery numeric'] = pkt.battery
+    values['Rssi numeric'] = pkt.rssi
+
+
+def _command_values(pkt, values):
+    """ Values of a Lighting1 or Lighting3 packet """
+    values['Command'] = pkt.cmnd_string
+    values['Rssi numeric'] = pkt.rssi
+
+
+def _lighting2_values(pkt, values):
+    """ Values of a Lighting2 packet """
+    values['Command'] = pkt.cmnd_string
+    values['Rssi numeric'] = pkt.rssi
+    if pkt.cmnd in [2, 5]:
+        values['Dim level'] = (pkt.level + 1) * 100 // 16
+
+
+def _lighting5_values(pkt, values):
+    """ Values of a Lighting5 packet """
+    values['Rssi numeric'] = pkt.rssi
+    if pkt.cmnd in [0x10]:
+        values['Dim level'] = (pkt.level + 1) * 100 // 32
+
+
+def _control_values(pkt, values):
+    """ Values of any other control packet """
+    values['Rssi numeric'] = pkt.rssi
+
+
+_SENSOR_EXTRACTORS = {lowlevel.Temp: _temp_values,
+                      lowlevel.Humid: _humid_values,
+                      lowlevel.TempHumid: _temphumid_values,
+                      lowlevel.Baro: _baro_values,
+                      lowlevel.TempHumidBaro: _temphumidbaro_values,
+                      lowlevel.Rain: _rain_values,
+                      lowlevel.Wind: _wind_values,
+                      lowlevel.Packet: _sensor_values,
+                      }
+
+_CONTROL_EXTRACTORS = {lowlevel.Lighting1: _command_values,
+                       lowlevel.Lighting2: _lighting2_values,
+                       lowlevel.Lighting3: _command_values,
+                       lowlevel.Lighting5: _lighting5_values,
+                       lowlevel.Packet: _control_values,
+                       }
+
+
 ###############################################################################
 # RFXtrxEvent class
 ###############################################################################
@@ -211,6 +1064,8 @@ def get_device(packettype, subtype, id_string):
 class RFXtrxEvent(object):
     """ Abstract superclass for all events """
 
+    __slots__ = ('device',)
+
     def __init__(self, device):
         self.device = device
 
@@ -220,39 +1075,46 @@ class RFXtrxEvent(object):
 ###############################################################################
 
 class SensorEvent(RFXtrxEvent):
-    """ Concrete class for sensor events """
+    """ Concrete class for sensor events
+
+        The decoded packet is available as pkt. The values dict is only
+        filled when it is first used. An event that is reloaded, see
+        reuse_objects, clears and refills the same dict.
+    """
+
+    __slots__ = ('pkt', '_values', '_filled')
 
     def __init__(self, pkt):
-        device = RFXtrxDevice(pkt)
+        device = _get_shared_device(pkt, RFXtrxDevice)
         super(SensorEvent, self).__init__(device)
+        self.pkt = pkt
+        self._values = None
+        self._filled = False
 
-        self.values = {}
-        if isinstance(pkt, lowlevel.Temp) \
-                or isinstance(pkt, lowlevel.TempHumid) \
-                or isinstance(pkt, lowlevel.TempHumidBaro):
-            self.values['Temperature'] = pkt.temp
-        if isinstance(pkt, lowlevel.Humid) \
-                or isinstance(pkt, lowlevel.TempHumid) \
-                or isinstance(pkt, lowlevel.TempHumidBaro):
-            self.values['Humidity'] = pkt.humidity
-            self.values['Humidity status'] = pkt.humidity_status_string
-            self.values['Humidity status numeric'] = pkt.humidity_status
-        if isinstance(pkt, lowlevel.Baro) \
-                or isinstance(pkt, lowlevel.TempHumidBaro):
-            self.values['Barometer'] = pkt.baro
-            self.values['Forecast'] = pkt.forecast_string
-            self.values['Forecast numeric'] = pkt.forecast
-        if isinstance(pkt, lowlevel.Rain):
-            self.values['Rain rate'] = pkt.rainrate
-            self.values['Rain total'] = pkt.raintotal
-        if isinstance(pkt, lowlevel.Wind):
-            self.values['Wind direction'] = pkt.direction
-            self.values['Wind average speed'] = pkt.average_speed
-            self.values['Wind gust'] = pkt.gust
-            self.values['Temperature'] = pkt.temperature
-            self.values['Chill'] = pkt.chill
-        self.values['Battery numeric'] = pkt.battery
-        self.values['Rssi numeric'] = pkt.rssi
+    def _load(self, pkt):
+        """ Reload the event in place from pkt """
+        self.device = _get_shared_device(pkt, RFXtrxDevice)
+        self.pkt = pkt
+        self._filled = False
+
+    @property
+    def values(self):
+        """ Dict with the values of the event, by name """
+        values = self._values
+        if not self._filled:
+            if values is None:
+                values = self._values = {}
+            else:
+                values.clear()
+            pkt = self.pkt
+            _get_extractor(_SENSOR_EXTRACTORS, type(pkt))(pkt, values)
+            self._filled = True
+        return values
+
+    @values.setter
+    def values(self, values):
+        self._values = values
+        self._filled = True
 
     def __str__(self):
         return "{0} device=[{1}] values={2}".format(
@@ -264,29 +1126,56 @@ class SensorEvent(RFXtrxEvent):
 ###############################################################################
 
 class ControlEvent(RFXtrxEvent):
-    """ Concrete class for control events """
+    """ Concrete class for control events
+
+        The decoded packet is available as pkt. The values dict is only
+        filled when it is first used. An event that is reloaded, see
+        reuse_objects, clears and refills the same dict.
+    """
+
+    __slots__ = ('pkt', '_values', '_filled')
 
     def __init__(self, pkt):
+        super(ControlEvent, self).__init__(self._get_device(pkt))
+        self.pkt = pkt
+        self._values = None
+        self._filled = False
+
+    @staticmethod
+    def _get_device(pkt):
+        """ Return the device that sent pkt """
         if isinstance(pkt, lowlevel.Lighting1) \
                 or isinstance(pkt, lowlevel.Lighting2) \
                 or isinstance(pkt, lowlevel.Lighting3) \
                 or isinstance(pkt, lowlevel.Lighting5) \
                 or isinstance(pkt, lowlevel.Lighting6):
-            device = LightingDevice(pkt)
-        else:
-            device = RFXtrxDevice(pkt)
-        super(ControlEvent, self).__init__(device)
+            return _get_shared_device(pkt, LightingDevice)
+        return _get_shared_device(pkt, RFXtrxDevice)
 
-        self.values = {}
-        if isinstance(pkt, lowlevel.Lighting1) \
-                or isinstance(pkt, lowlevel.Lighting2) \
-                or isinstance(pkt, lowlevel.Lighting3):
-            self.values['Command'] = pkt.cmnd_string
-        if isinstance(pkt, lowlevel.Lighting2) and pkt.cmnd in [2, 5]:
-            self.values['Dim level'] = (pkt.level + 1) * 100 // 16
-        if isinstance(pkt, lowlevel.Lighting5) and pkt.cmnd in [0x10]:
-            self.values['Dim level'] = (pkt.level + 1) * 100 // 32
-        self.values['Rssi numeric'] = pkt.rssi
+    def _load(self, pkt):
+        """ Reload the event in place from pkt """
+        self.device = self._get_device(pkt)
+        self.pkt = pkt
+        self._filled = False
+
+    @property
+    def values(self):
+        """ Dict with the values of the event, by name """
+        values = self._values
+        if not self._filled:
+            if values is None:
+                values = self._values = {}
+            else:
+                values.clear()
+            pkt = self.pkt
+            _get_extractor(_CONTROL_EXTRACTORS, type(pkt))(pkt, values)
+            self._filled = True
+        return values
+
+    @values.setter
+    def values(self, values):
+        self._values = values
+        self._filled = True
 
     def __str__(self):
         return "{0} device=[{1}] values={2}".format(
@@ -299,9 +1188,15 @@ class ControlEvent(RFXtrxEvent):
 class StatusEvent(RFXtrxEvent):
     """ Concrete class for status """
 
+    __slots__ = ()
+
     def __init__(self, pkt):
         super(StatusEvent, self).__init__(pkt)
 
+    def _load(self, pkt):
+        """ Reload the event in place from pkt """
+        self.device = pkt
+
     def __str__(self):
         return "{0} device=[{1}]".format(
             type(self), self.device)
@@ -0,0 +1,184 @@
+# This file is part of pyRFXtrx, a Python library to communicate with
+# the RFXtrx family of devices from http://www.rfxcom.com/
+# See https://github.com/woudt/pyRFXtrx for the latest version.
+#
+# Copyright (C) 2012  Edwin Woudt <edwin@woudt.nl>
+#
+# pyRFXtrx is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyRFXtrx is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pyRFXtrx.  See the file COPYING.txt in the distribution.
+# If not, see <http://www.gnu.org/licenses/>.
+"""
+This module merges the events of several RFXtrx receivers into one stream
+"""
+
+import threading
+from collections import deque
+
+from . import _fingerprint, _now
+
+# Default maximum number of devices in Aggregator.receivers
+_RECEIVERS_SIZE = 4096
+
+
+class Aggregator(object):
+    """ Merges the events received by several transports
+
+        Events are passed to feed() with the transport that received them,
+        or read from every transport with receive_blocking() in a thread
+        per transport after start(). A message that is received by several
+        receivers within window seconds is returned by get() once, window
+        seconds after it was first received, as the copy with the best rssi.
+        The other copies are counted in duplicates. Events of the RFXtrx
+        itself, like a StatusEvent, are returned without waiting.
+
+        receivers maps every device to a dict with the rssi it was last
+        received with by each transport, and best_receiver() returns the
+        transport that hears a device best, to send commands to it with.
+        It is cleared when it holds max_receivers devices, to bound memory
+        use when noise is received as frames with random ids.
+
+        As events are kept for the window, the transports must not have
+        reuse_objects set.
+    """
+
+    def __init__(self, transports, window=0.2, max_receivers=_RECEIVERS_SIZE):
+        self.transports = list(transports)
+        self.window = window
+        self.duplicates = 0
+        self.receivers = {}
+        self.max_receivers = max_receivers
+        # transports that ended with an exception, see start()
+        self.errors = {}
+        # [deadline, event, transport, rssi, key] by key, which is the
+        # device_key and fingerprint, in the order in which they were first
+        # received, and the one within its window by key
+        self._pending = {}
+        self._order = deque()
+        self._ready = deque()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._running = 0
+
+    def feed(self, event, transport):
+        """ Add event, received by transport """
+        pkt = getattr(event, 'pkt', None)
+        with self._condition:
+            if pkt is None:
+                self._ready.append(event)
+                self._condition.notify()
+                return
+            rssi = pkt.rssi
+            received = self.receivers.get(event.device)
+            if received is None:
+                if len(self.receivers) >= self.max_receivers:
+                    self.receivers.clear()
+                received = self.receivers[event.device] = {}
+            received[transport] = rssi
+            frame = pkt._frame()  # pylint: disable=W0212
+            key = (pkt.device_key, _fingerprint(frame))
+            now = _now()
+            entry = self._pending.get(key)
+            if entry is not None and entry[0] > now:
+                self.duplicates += 1
+                # packets without an rssi, like Wind subtype 0x03, count
+                # as received with the lowest rssi
+                if rssi is not None and (entry[3] is None or rssi > entry[3]):
+                    entry[1:4] = [event, transport, rssi]
+                return
+            entry = [now + self.window, event, transport, rssi, key]
+            self._pending[key] = entry
+            self._order.append(entry)
+            self._condition.notify()
+
+    def best_receiver(self, device):
+        """ Return the transport that received device with the best rssi
+            the last time each transport received it, or None if none did
+        """
+        received = self.receivers.get(device)
+        if not received:
+            return None
+        best = None
+        for transport in self.transports:
+            rssi = received.get(transport)
+            if rssi is not None and (best is None or rssi > received[best]):
+                best = transport
+        return best
+
+    def get(self, timeout=None):
+        """ Return the next event, waiting at most timeout seconds if given,
+            or None if there is no event in time. After start(), returns
+            None as well once no events are left and the threads of all
+            transports have ended, or raises the exception that ended one
+        """
+        deadline = None if timeout is None else _now() + timeout
+        with self._condition:
+            while True:
+                if self._ready:
+                    return self._ready.popleft()
+                now = _now()
+                wait = None
+                if self._order:
+                    entry = self._order[0]
+                    if entry[0] <= now:
+                        self._order.popleft()
+                        if self._pending.get(entry[4]) is entry:
+                            del self._pending[entry[4]]
+                        return entry[1]
+                    wait = entry[0] - now
+                elif self._threads and not self._running:
+                    for transport in self.transports:
+                        if transport in self.errors:
+                            raise self.errors[transport]
+                    return None
+                if deadline is not None:
+                    if now >= deadline:
+                        return None
+                    if wait is None or deadline - now < wait:
+                        wait = deadline - now
+                self._condition.wait(wait)
+
+    def __iter__(self):
+        """ Iterate over the events, until get() returns None """
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    def start(self):
+        """ Start a thread for every transport, that reads its events with
+            receive_blocking() and feeds them. A thread ends when
+            receive_blocking() raises an exception, which is kept in errors.
+            Call reset() on the transports before this
+        """
+        for transport in self.transports:
+            thread = threading.Thread(target=self._run, args=(transport,))
+            thread.daemon = True
+            self._threads.append(thread)
+            with self._condition:
+                self._running += 1
+            thread.start()
+
+    def _run(self, transport):
+        """ Body of the thread of transport """
+        try:
+            while True:
+                event = transport.receive_blocking()
+                if event is not None:
+                    self.feed(event, transport)
+        except Exception as exc:  # pylint: disable=W0703
+            self.errors[transport] = exc
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
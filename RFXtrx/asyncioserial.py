@@ -0,0 +1,251 @@
+# This file is part of pyRFXtrx, a Python library to communicate with
+# the RFXtrx family of devices from http://www.rfxcom.com/
+# See https://github.com/woudt/pyRFXtrx for the latest version.
+#
+# Copyright (C) 2012  Edwin Woudt <edwin@woudt.nl>
+#
+# pyRFXtrx is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyRFXtrx is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pyRFXtrx.  See the file COPYING.txt in the distribution.
+# If not, see <http://www.gnu.org/licenses/>.
+"""
+This module provides a transport for asyncio, for Python 3.6 and later. It
+runs on the event loop without any threads, using the serial port (or any
+other terminal device, like a pty) as a pipe. POSIX systems only.
+"""
+
+import asyncio
+import os
+import termios
+
+from . import RFXtrxTransport, StatusEvent
+from .lowlevel import Status, StreamFramer
+
+_RESET = bytes(bytearray([0x0D] + [0x00] * 13))
+_GET_STATUS = bytes(bytearray([0x0D, 0x00, 0x00, 0x01, 0x02] + [0x00] * 9))
+
+
+def _open_port(port):
+    """ Open port in raw mode at 38400 baud and return its file descriptor """
+    fd = os.open(port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    try:
+        attrs = termios.tcgetattr(fd)
+        attrs[0] = 0  # iflag
+        attrs[1] = 0  # oflag
+        attrs[2] = termios.CS8 | termios.CREAD | termios.CLOCAL  # cflag
+        attrs[3] = 0  # lflag
+        attrs[4] = attrs[5] = termios.B38400  # ispeed, ospeed
+        attrs[6][termios.VMIN] = 0
+        attrs[6][termios.VTIME] = 0
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    except:
+        os.close(fd)
+        raise
+    return fd
+
+
+class _AsyncioReadProtocol(asyncio.Protocol):
+    """ asyncio Protocol for the reading side of the port, used internally
+        by AsyncioSerialTransport
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        """ Called by asyncio when data is received """
+        self.transport._data_received(data)  # pylint: disable=W0212
+
+    def connection_lost(self, exc):
+        """ Called by asyncio when the port is closed """
+        self.transport._connection_lost(exc)  # pylint: disable=W0212
+
+
+class _AsyncioWriteProtocol(asyncio.BaseProtocol):
+    """ asyncio Protocol for the writing side of the port, used internally
+        by AsyncioSerialTransport
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def pause_writing(self):
+        """ Called by asyncio when the write buffer is full """
+        self.transport._write_paused = True  # pylint: disable=W0212
+
+    def resume_writing(self):
+        """ Called by asyncio when the write buffer has drained """
+        self.transport._resume_writing()  # pylint: disable=W0212
+
+    def connection_lost(self, exc):
+        """ Called by asyncio when the port is closed """
+        self.transport._resume_writing()  # pylint: disable=W0212
+
+
+class AsyncioSerialTransport(RFXtrxTransport):
+    """ Transport implementation for asyncio
+
+        Call connect() before use. Received events are queued until they
+        are taken from events(); when queue_size events are waiting, reading
+        from the port is paused. As events are queued, do not set
+        reuse_objects on this transport. With write_window set, send()
+        buffers the packet and returns without waiting, and the buffer is
+        written from the event loop, see RFXtrxTransport.send_many().
+    """
+
+    def __init__(self, port, debug=False, queue_size=1000):
+        super(AsyncioSerialTransport, self).__init__()
+        self.port = port
+        self.debug = debug
+        self.queue_size = queue_size
+        self.framer = StreamFramer(self.rejected)
+        self._queue = None
+        self._loop = None
+        self._reader = None
+        self._writer = None
+        self._read_paused = False
+        self._write_paused = False
+        self._drain_waiters = []
+        self._status_waiter = None
+
+    async def connect(self):
+        """ Open the port """
+        self._loop = loop = asyncio.get_running_loop()
+        fd = _open_port(self.port)
+        # separate file descriptors, as both pipe transports close theirs
+        try:
+            writefd = os.dup(fd)
+        except:
+            os.close(fd)
+            raise
+        self._queue = asyncio.Queue()
+        self._reader, _ = await loop.connect_read_pipe(
+            lambda: _AsyncioReadProtocol(self), os.fdopen(fd, 'rb', 0))
+        self._writer, _ = await loop.connect_write_pipe(
+            lambda: _AsyncioWriteProtocol(self), os.fdopen(writefd, 'wb', 0))
+
+    def close(self):
+        """ Close the port, which ends events() """
+        self._reader.close()
+        self._writer.close()
+
+    async def events(self):
+        """ Asynchronous iterator over the received events, which ends when
+            the port is closed
+        """
+        queue = self._queue
+        while True:
+            event = await queue.get()
+            if event is None:
+                return
+            if self._read_paused and queue.qsize() <= self.queue_size // 2:
+                self._read_paused = False
+                self._reader.resume_reading()
+            yield event
+
+    async def send(self, data):
+        """ Send the given packet, waiting while the write buffer is full """
+        if isinstance(data, (bytearray, bytes, memoryview)):
+            pkt = data
+        elif isinstance(data, str):
+            pkt = bytearray(data, 'latin-1')
+        else:
+            raise ValueError("Invalid type")
+        if self.write_window is not None:
+            self._buffer_write(pkt)
+            return
+        self._write(pkt)
+        if self._write_paused:
+            waiter = asyncio.get_running_loop().create_future()
+            self._drain_waiters.append(waiter)
+            await waiter
+
+    async def transmit(self, data, callback=None, key=None, prepare=None):
+        """ Send the given packet with the next seqnbr, and return its
+            Transmission, see RFXtrxTransport.transmit(). Use callback
+            rather than Transmission.wait(), which blocks the event loop
+        """
+        transmission = self._queue_transmission(data, callback, key, prepare)
+        for queued in self._next_transmissions():
+            await self.send(queued.data)
+        return transmission
+
+    def _send_transmission(self, transmission):
+        """ Send a queued transmission without waiting for the write buffer
+            to drain, as parse() is called from the protocol
+        """
+        self._write(transmission.data)
+
+    def _write(self, pkt):
+        """ Write the given packet to the port """
+        if self.debug:
+            print("Send: " + " ".join("0x{0:02x}".format(x)
+                                      for x in bytearray(pkt)))
+        self._writer.write(pkt)
+
+    def _call_later(self, delay, function):
+        """ Call function from the event loop after delay seconds """
+        self._loop.call_later(delay, function)
+
+    async def reset(self, timeout=5):
+        """ Reset the RFXtrx, and return the StatusEvent it responds with.
+            Events received before the reset are discarded
+        """
+        await self.send(_RESET)
+        await asyncio.sleep(0.3)  # Should work with 0.05, but not for me
+        self.framer.clear()
+        while not self._queue.empty():
+            if self._queue.get_nowait() is None:
+                self._queue.put_nowait(None)
+                raise EOFError("Port closed")
+        self._status_waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self.send(_GET_STATUS)
+            return await asyncio.wait_for(self._status_waiter, timeout)
+        finally:
+            self._status_waiter = None
+
+    def _data_received(self, data):
+        """ Handle received data """
+        for frame in self.framer.feed(data):
+            if self.debug:
+                print("Recv: " + " ".join("0x{0:02x}".format(x)
+                                          for x in frame))
+            event = self.parse(frame)
+            if event is None:
+                continue
+            waiter = self._status_waiter
+            if isinstance(event, StatusEvent) \
+                    and isinstance(event.device, Status) \
+                    and waiter is not None \
+                    and not waiter.done():
+                waiter.set_result(event)
+                continue
+            self._queue.put_nowait(event)
+        if not self._read_paused and self._queue.qsize() >= self.queue_size:
+            self._read_paused = True
+            self._reader.pause_reading()
+
+    def _connection_lost(self, exc):
+        """ Handle the port being closed """
+        waiter = self._status_waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_exception(exc or EOFError("Port closed"))
+        self._queue.put_nowait(None)
+
+    def _resume_writing(self):
+        """ Wake up the senders waiting for the write buffer to drain """
+        self._write_paused = False
+        waiters, self._drain_waiters = self._drain_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
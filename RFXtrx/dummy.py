@@ -28,6 +28,7 @@ class DummyTransport(RFXtrxTransport):
     """ Dummy transport for testing purposes """
 
     def __init__(self, debug=True):
+        super(DummyTransport, self).__init__()
         self.debug = debug
 
     def receive(self, data):
@@ -41,5 +42,13 @@ class DummyTransport(RFXtrxTransport):
         """ Emulate a send by doing nothing (except printing debug info if
             requested) """
         pkt = bytearray(data)
+        if self.write_window is not None:
+            self._buffer_write(pkt)
+        else:
+            self._write(pkt)
+
+    def _write(self, data):
+        """ Emulate a write by doing nothing (except printing debug info if
+            requested) """
         if self.debug:
-            print ("Send: " + " ".join("0x{0:02x}".format(x) for x in pkt))
+            print ("Send: " + " ".join("0x{0:02x}".format(x) for x in data))
@@ -23,83 +23,397 @@ RFXtrx.
 """
 # pylint: disable=C0302,R0902,R0903,R0911,R0913
 
+from struct import Struct, error as StructError
 
-def parse(data):
-    """ Parse a packet from a bytearray """
-    if data[0] == 0:
+
+UNKNOWN_TYPE = 'unknown type'
+BAD_LENGTH = 'bad length'
+TRUNCATED = 'truncated'
+REJECT_REASONS = (UNKNOWN_TYPE, BAD_LENGTH, TRUNCATED)
+
+
+def parse(data, offset=0, packets=None, rejected=None):
+    """ Parse a packet from a bytearray, or from the frame starting at offset
+        in any buffer such as a memoryview. A (buffer, offset) tuple is
+        accepted as well. The frame is decoded in place, see Packet.data
+
+        If a packets dict is given, it holds one packet instance per
+        packettype, and the frame is loaded into that instance instead of a
+        new one. The returned packet is then only valid until the next call
+        to parse() with the same dict.
+
+        Frames of an unknown packettype, with a packetlength that does not
+        match PACKET_LENGTHS or is outside PACKET_MIN_LENGTHS and
+        PACKET_MAX_LENGTHS, or that are shorter than
+        their packetlength are rejected before any packet is loaded, and None
+        is returned. If a rejected dict is given, the count for the reason
+        (one of REJECT_REASONS) is incremented in it.
+    """
+    if isinstance(data, tuple):
+        data, offset = data
+    length = data[offset]
+    if length == 0:
         # null length packet - sometimes happens on initialization
         return None
-    if data[1] == 0x01:
-        pkt = Status()
-        pkt.load_receive(data)
-        return pkt
-    if data[1] == 0x10:
-        pkt = Lighting1()
-        pkt.load_receive(data)
-        return pkt
-    if data[1] == 0x11:
-        pkt = Lighting2()
-        pkt.load_receive(data)
-        return pkt
-    if data[1] == 0x12:
-        pkt = Lighting3()
-        pkt.load_receive(data)
-        return pkt
-    if data[1] == 0x13:
-        pkt = Lighting4()
-        pkt.load_receive(data)
-        return pkt
-    if data[1] == 0x14:
-        pkt = Lighting5()
-        pkt.load_receive(data)
-        return pkt
-    if data[1] == 0x15:
-        pkt = Lighting6()
-        pkt.load_receive(data)
-        return pkt
-    if data[1] == 0x50:
-        pkt = Temp()
-        pkt.load_receive(data)
-        return pkt
-    if data[1] == 0x52:
-        pkt = TempHumid()
-        pkt.load_receive(data)
-        return pkt
-    if data[1] == 0x54:
-        pkt = TempHumidBaro()
-        pkt.load_receive(data)
-        return pkt
-    if data[1] == 0x55:
-        pkt = RainGauge()
-        pkt.load_receive(data)
-        return pkt
-    if data[1] == 0x56:
-        pkt = Wind()
+    if len(data) - offset <= length:
+        if rejected is not None:
+            rejected[TRUNCATED] += 1
+        return None
+    packettype = data[offset + 1]
+    cls = PACKET_TYPES.get(packettype)
+    if cls is None:
+        if rejected is not None:
+            rejected[UNKNOWN_TYPE] += 1
+        return None
+    expected = PACKET_LENGTHS.get(packettype)
+    if length != expected and (
+            expected is not None or
+            length < PACKET_MIN_LENGTHS.get(packettype, 0) or
+            length > PACKET_MAX_LENGTHS.get(packettype, 0xff)):
+        if rejected is not None:
+            rejected[BAD_LENGTH] += 1
+        return None
+    if packets is not None and packettype in packets:
+        pkt = packets[packettype]
+    else:
+        pkt = cls()
+        if packets is not None:
+            packets[packettype] = pkt
+    if offset:
+        pkt.load_receive(data, offset)
+    else:
         pkt.load_receive(data)
-        return pkt
+    return pkt
+
+
+def register_packet_type(packettype, cls, packetlength=None):
+    """ Register cls as the Packet subclass used by parse() to decode packets
+        of the given packettype, replacing any existing registration. Its
+        load_receive() must accept an offset argument to be used with parse()
+        on frames that do not start at the beginning of a buffer. If all
+        packets of this type have the same length, pass it as packetlength
+        so that parse() and StreamFramer can use it to detect corrupted data
+    """
+    if not 0 <= packettype <= 0xff:
+        raise ValueError("Invalid packettype")
+    PACKET_TYPES[packettype] = cls
+    PACKET_MIN_LENGTHS.pop(packettype, None)
+    PACKET_MAX_LENGTHS.pop(packettype, None)
+    if packetlength is None:
+        PACKET_LENGTHS.pop(packettype, None)
+    else:
+        PACKET_LENGTHS[packettype] = packetlength
+
+
+###############################################################################
+# StreamFramer class
+###############################################################################
+
+# Longest packetlength of the packets that the RFXtrx sends. StreamFramer
+# does not skip frames of unknown packet types that claim to be longer.
+_MAX_SKIP_LENGTH = 0x24
+
+
+class StreamFramer(object):
+    """ Splits the byte stream received from an RFXtrx into frames.
+
+        Data can be fed in chunks of any size: a chunk may hold several
+        frames, and a frame may be split over several chunks. Null bytes
+        between frames are skipped. A frame with a packettype that is not in
+        PACKET_TYPES is skipped as a whole, using its length byte, as the
+        RFXtrx sends many packet types that are not decoded. A frame of a
+        type in PACKET_TYPES is only accepted if its length byte is valid for
+        that type, as in parse(). Otherwise, or if the length byte is longer
+        than any packet, the data is assumed to be corrupted, and the framer
+        moves on one byte at a time until it finds a plausible frame start
+        again.
+
+        If a rejected dict is given, every skipped frame and every byte
+        skipped for a wrong length is counted in it like parse() does.
+    """
+
+    __slots__ = ('buffer', 'rejected')
+
+    def __init__(self, rejected=None):
+        """Constructor"""
+        self.buffer = bytearray()
+        self.rejected = rejected
+
+    def feed(self, data):
+        """ Add received data and return a list with a bytearray for each
+            frame that is now complete
+        """
+        buf = self.buffer
+        buf.extend(data)
+        end = len(buf)
+        frames = []
+        pos = 0
+        while pos < end:
+            length = buf[pos]
+            if length == 0:
+                # null length packet - sometimes happens on initialization
+                pos += 1
+                continue
+            if pos + 1 == end:
+                break
+            packettype = buf[pos + 1]
+            if packettype not in PACKET_TYPES:
+                if length > _MAX_SKIP_LENGTH:
+                    # no packet is this long, so this is not a frame start
+                    if self.rejected is not None:
+                        self.rejected[UNKNOWN_TYPE] += 1
+                    pos += 1
+                    continue
+                if pos + length >= end:
+                    break
+                if self.rejected is not None:
+                    self.rejected[UNKNOWN_TYPE] += 1
+                pos += length + 1
+                continue
+            expected = PACKET_LENGTHS.get(packettype)
+            if length != expected and (
+                    expected is not None or
+                    length < PACKET_MIN_LENGTHS.get(packettype, 0) or
+                    length > PACKET_MAX_LENGTHS.get(packettype, 0xff)):
+                if self.rejected is not None:
+                    self.rejected[BAD_LENGTH] += 1
+                pos += 1
+                continue
+            if pos + length >= end:
+                break
+            frames.append(buf[pos:pos + length + 1])
+            pos += length + 1
+        if pos:
+            del buf[:pos]
+        return frames
+
+    def clear(self):
+        """ Discard any partially received frame """
+        del self.buffer[:]
+
+
+###############################################################################
+# TransmitBuffer class
+###############################################################################
+
+class TransmitBuffer(object):
+    """ Encodes packets to be transmitted back to back into one buffer.
+
+        Each packet is written from the precompiled template of its class,
+        so only the data fields are filled in, and the whole batch can be
+        handed to the transport in a single write. The buffer is reused
+        after clear(). The view returned by getvalue() must be released
+        before more packets are added that do not fit in the buffer.
+    """
+
+    __slots__ = ('buffer', 'length')
+
+    def __init__(self, size=256):
+        """Constructor"""
+        self.buffer = bytearray(size)
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def add(self, cls, *args):
+        """ Add a packet of the given class, with the same arguments as
+            its set_transmit method
+        """
+        buf = self.buffer
+        needed = self.length + len(cls._TX_TEMPLATE) - len(buf)
+        if needed > 0:
+            buf.extend(bytearray(max(needed, len(buf))))
+        self.length += cls.encode_transmit(buf, self.length, *args)
+
+    def getvalue(self):
+        """ Return a memoryview of the encoded packets """
+        return memoryview(self.buffer)[:self.length]
+
+    def clear(self):
+        """ Remove all packets, keeping the allocated buffer """
+        self.length = 0
 
 
 ###############################################################################
 # Packet class
 ###############################################################################
 
+_PENDING = object()
+"""
+Marker for a convenience string that has not been built yet
+"""
+
+_ID_STRINGS = {}
+"""
+Cache of id_string values, keyed by the result of Packet._id_key(), so that
+repeated frames from the same device share one string object
+"""
+
+_ID_STRINGS_SIZE = 4096
+"""
+Maximum number of entries in _ID_STRINGS before it is cleared
+"""
+
+
 class Packet(object):
     """ Abstract superclass for all low level packets """
 
+    __slots__ = ('packetlength', 'packettype', 'subtype', 'seqnbr', 'rssi',
+                 'rssi_byte', '_data', '_buffer', '_offset', '_type_string',
+                 '_id_string', '_cmnd_string')
+
     _UNKNOWN_TYPE = "Unknown type ({0:#04x}/{1:#04x})"
     _UNKNOWN_CMND = "Unknown command ({0:#04x})"
 
+    TYPES = {}
+    """
+    Mapping of numeric subtype values to strings, used in type_string
+    """
+
     def __init__(self):
         """Constructor"""
-        self.data = None
+        self._data = None
+        self._buffer = None
+        self._offset = 0
         self.packetlength = None
         self.packettype = None
         self.subtype = None
         self.seqnbr = None
         self.rssi = None
         self.rssi_byte = None
-        self.type_string = None
-        self.id_string = None
+        self._type_string = None
+        self._id_string = None
+        self._cmnd_string = None
+
+    @property
+    def data(self):
+        """The raw packet as a bytearray.
+
+        A packet that was loaded from a memoryview, or from a frame within a
+        larger buffer, refers to that buffer until data is first read, and
+        only then copies its frame out of it. The buffer must not be modified
+        before that happens, so read data first if the packet needs to
+        outlive a buffer that is going to be reused.
+        """
+        if self._buffer is not None:
+            end = self._offset + self._buffer[self._offset] + 1
+            self._data = bytearray(self._buffer[self._offset:end])
+            self._buffer = None
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._buffer = None
+
+    def _frame(self):
+        """Return the raw packet like data, but without copying it out of
+        the buffer it was loaded from: as a memoryview of that buffer, only
+        valid until the buffer is modified"""
+        if self._buffer is not None:
+            end = self._offset + self._buffer[self._offset] + 1
+            return memoryview(self._buffer)[self._offset:end]
+        return self._data
+
+    def _set_buffer(self, data, offset):
+        """Refer to the frame at offset in data, without copying it"""
+        if offset == 0 and isinstance(data, bytearray) \
+                and len(data) == data[0] + 1:
+            # the frame is a bytearray of its own, so use it as data as is
+            self._data = data
+            self._buffer = None
+        else:
+            self._data = None
+            self._buffer = data
+            self._offset = offset
+
+    @property
+    def type_string(self):
+        """String describing the subtype, built on first access"""
+        if self._type_string is _PENDING:
+            self._type_string = self._format_type()
+        return self._type_string
+
+    @type_string.setter
+    def type_string(self, value):
+        self._type_string = value
+
+    @property
+    def id_string(self):
+        """String identifying the device, built on first access"""
+        value = self._id_string
+        if value is _PENDING:
+            key = self._id_key()
+            if key is None:
+                value = self._format_id()
+            else:
+                value = _ID_STRINGS.get(key)
+                if value is None:
+                    value = self._format_id()
+                    if len(_ID_STRINGS) >= _ID_STRINGS_SIZE:
+                        _ID_STRINGS.clear()
+                    _ID_STRINGS[key] = value
+            self._id_string = value
+        return value
+
+    @id_string.setter
+    def id_string(self, value):
+        self._id_string = value
+
+    @property
+    def cmnd_string(self):
+        """String describing the command, built on first access"""
+        if self._cmnd_string is _PENDING:
+            self._cmnd_string = self._format_cmnd()
+        return self._cmnd_string
+
+    @cmnd_string.setter
+    def cmnd_string(self, value):
+        self._cmnd_string = value
+
+    def _set_strings(self):
+        """Mark the convenience strings to be rebuilt from the loaded numeric
+           values on first access"""
+        self._type_string = _PENDING
+        self._id_string = _PENDING
+        self._cmnd_string = _PENDING
+
+    def _format_type(self):
+        """Return the type_string for the loaded numeric values"""
+        if self.subtype in self.TYPES:
+            return self.TYPES[self.subtype]
+        #Degrade nicely for yet unknown subtypes
+        return self._UNKNOWN_TYPE.format(self.packettype, self.subtype)
+
+    def _id_key(self):
+        """Return the values that id_string is built from, or None if it is
+           not to be cached"""
+        return None
+
+    @property
+    def device_key(self):
+        """Integer identifying the device, with packettype, subtype and the
+           raw id fields packed into it. For packet types that do not
+           implement _device_id(), like those added with
+           register_packet_type(), a (packettype, subtype, id_string) tuple"""
+        device_id = self._device_id()
+        if device_id is None:
+            return (self.packettype, self.subtype, self.id_string)
+        return (self.packettype << 8 | self.subtype) << 40 | device_id
+
+    def _device_id(self):
+        """Return the raw id fields packed into an integer of at most 40
+           bits, or None if the packet type does not implement it"""
+        return None
+
+    def _format_id(self):
+        """Return the id_string for the loaded numeric values"""
+        return None
+
+    def _format_cmnd(self):
+        """Return the cmnd_string for the loaded numeric values"""
+        return None
 
 
 ###############################################################################
@@ -120,6 +434,8 @@ class Status(Packet):
     Data class for the Status packet type
     """
 
+    __slots__ = ('tranceiver_type', 'firmware_version', 'devices')
+
     TYPES = {
         0x50: '310MHz',
         0x51: '315MHz',
@@ -136,6 +452,8 @@ class Status(Packet):
     Mapping of numeric subtype values to strings, used in type_string
     """
 
+    _STRUCT = Struct('>10B')
+
     def __str__(self):
         return ("Status [subtype={0}, firmware={1}, devices={2}]") \
             .format(self.type_string, self.firmware_version, self.devices)
@@ -147,33 +465,93 @@ class Status(Packet):
         self.firmware_version = None
         self.devices = None
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-
-        self.tranceiver_type = data[5]
-        self.firmware_version = data[6]
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr, _,
+         self.tranceiver_type,
+         self.firmware_version, msg3, msg4,
+         msg5) = self._STRUCT.unpack_from(data, offset)
 
         devs = set()
-        devs.update(_decode_flags(data[7] / 0x80,
+        devs.update(_decode_flags(msg3 >> 7,
             'undecoded'))
-        devs.update(_decode_flags(data[8],
+        devs.update(_decode_flags(msg4,
             'mertik lightwarerf hideki lacrosse fs20 proguard'))
-        devs.update(_decode_flags(data[9],
+        devs.update(_decode_flags(msg5,
             'x10 arc ac homeeasy ikeakoppla oregon ati visonic'))
         self.devices = sorted(devs)
 
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
+    def _format_type(self):
+        """Return the type_string for the loaded numeric values"""
         if self.tranceiver_type in self.TYPES:
-            self.type_string = self.TYPES[self.tranceiver_type]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = 'Unknown'
+            return self.TYPES[self.tranceiver_type]
+        #Degrade nicely for yet unknown subtypes
+        return 'Unknown'
+
+
+###############################################################################
+# TransmitterResponse class
+###############################################################################
+
+class TransmitterResponse(Packet):
+    """
+    Data class for the TransmitterResponse packet type, sent by the RFXtrx in
+    response to a transmit command with the same seqnbr
+    """
+
+    __slots__ = ('msg',)
+
+    TYPES = {0x00: 'Error, receiver did not lock',
+             0x01: 'Transmitter response',
+             }
+    """
+    Mapping of numeric subtype values to strings, used in type_string
+    """
+
+    MESSAGES = {0x00: 'ACK, transmit OK',
+                0x01: 'ACK, but transmit started after 3 seconds delay ' +
+                      'anyway with RF receive data',
+                0x02: 'NAK, transmitter did not lock on the requested ' +
+                      'frequency',
+                0x03: 'NAK, AC address zero in id1-id4 not allowed',
+                }
+    """
+    Mapping of msg numeric values to strings, used for cmnd_string
+    """
+
+    _STRUCT = Struct('>5B')
+
+    def __str__(self):
+        return ("TransmitterResponse [subtype={0}, seqnbr={1}, msg={2}]") \
+            .format(self.type_string, self.seqnbr, self.cmnd_string)
+
+    def __init__(self):
+        """Constructor"""
+        super(TransmitterResponse, self).__init__()
+        self.msg = None
+
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         self.msg) = self._STRUCT.unpack_from(data, offset)
+        self._set_strings()
+
+    @property
+    def ack(self):
+        """Whether the command was transmitted"""
+        return self.subtype == 0x01 and self.msg in (0x00, 0x01)
+
+    def _format_cmnd(self):
+        """Return the cmnd_string for the loaded numeric values"""
+        if self.subtype != 0x01:
+            return None
+        if self.msg in self.MESSAGES:
+            return self.MESSAGES[self.msg]
+        return self._UNKNOWN_CMND.format(self.msg)
 
 
 ###############################################################################
@@ -185,6 +563,8 @@ class Lighting1(Packet):
     Data class for the Lighting1 packet type
     """
 
+    __slots__ = ('housecode', 'unitcode', 'cmnd')
+
     TYPES = {0x00: 'X10 lighting',
              0x01: 'ARC',
              0x02: 'ELRO AB400D',
@@ -232,6 +612,11 @@ class Lighting1(Packet):
     Mapping of command numeric values to strings, used for cmnd_string
     """
 
+    _STRUCT = Struct('>8B')
+
+    _TX_TEMPLATE = bytes(bytearray([0x07, 0x10] + [0x00] * 6))
+    _TX_STRUCT = Struct('>5B')
+
     def __str__(self):
         return ("Lighting1 [subtype={0}, seqnbr={1}, id={2}, cmnd={3}, " +
                 "rssi={4}]") \
@@ -244,7 +629,6 @@ class Lighting1(Packet):
         self.housecode = None
         self.unitcode = None
         self.cmnd = None
-        self.cmnd_string = None
 
     def parse_id(self, subtype, id_string):
         """Parse a string id into individual components"""
@@ -257,22 +641,18 @@ class Lighting1(Packet):
                     self.housecode = hcode_num
             self.unitcode = int(id_string[1:])
             self._set_strings()
+            valid = self.id_string == id_string
         except:
             raise ValueError("Invalid id_string")
-        if self.id_string != id_string:
+        if not valid:
             raise ValueError("Invalid id_string")
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-        self.subtype = data[2]
-        self.seqnbr = data[3]
-        self.housecode = data[4]
-        self.unitcode = data[5]
-        self.cmnd = data[6]
-        self.rssi_byte = data[7]
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         self.housecode, self.unitcode, self.cmnd,
+         self.rssi_byte) = self._STRUCT.unpack_from(data, offset)
         self.rssi = self.rssi_byte >> 4
         self._set_strings()
 
@@ -287,25 +667,44 @@ class Lighting1(Packet):
         self.cmnd = cmnd
         self.rssi_byte = 0
         self.rssi = 0
-        self.data = bytearray([self.packetlength, self.packettype,
-                               self.subtype, self.seqnbr, self.housecode,
-                               self.unitcode, self.cmnd, self.rssi_byte])
+        self.data = bytearray(len(self._TX_TEMPLATE))
+        self.encode_transmit(self.data, 0, subtype, seqnbr, housecode,
+                             unitcode, cmnd)
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
-        self.id_string = self.HOUSECODES[self.housecode] + str(self.unitcode)
-        if self.subtype in self.TYPES:
-            self.type_string = self.TYPES[self.subtype]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = self._UNKNOWN_TYPE.format(self.packettype,
-                                                         self.subtype)
-        if self.cmnd is not None:
-            if self.cmnd in self.COMMANDS:
-                self.cmnd_string = self.COMMANDS[self.cmnd]
-            else:
-                self.cmnd_string = self._UNKNOWN_CMND.format(self.cmnd)
+    @classmethod
+    def encode_transmit(cls, buf, offset, subtype, seqnbr, housecode, unitcode,
+                        cmnd):
+        """Write a packet with the given data fields into buf at offset,
+           returning the number of bytes written"""
+        template = cls._TX_TEMPLATE
+        buf[offset:offset + len(template)] = template
+        try:
+            cls._TX_STRUCT.pack_into(buf, offset + 2, subtype, seqnbr,
+                                     housecode, unitcode, cmnd)
+        except StructError:
+            raise ValueError("Invalid data field")
+        return len(template)
+
+    def _id_key(self):
+        """Return the values that id_string is built from"""
+        return (self.packettype, self.subtype, self.housecode, self.unitcode)
+
+    def _device_id(self):
+        """Return the raw id fields packed into an integer"""
+        return self.housecode << 8 | self.unitcode
+
+    def _format_id(self):
+        """Return the id_string for the loaded numeric values"""
+        return self.HOUSECODES[self.housecode] + str(self.unitcode)
+
+    def _format_cmnd(self):
+        """Return the cmnd_string for the loaded numeric values"""
+        if self.cmnd is None:
+            return None
+        if self.cmnd in self.COMMANDS:
+            return self.COMMANDS[self.cmnd]
+        return self._UNKNOWN_CMND.format(self.cmnd)
 
 
 ###############################################################################
@@ -317,6 +716,9 @@ class Lighting2(Packet):
     Data class for the Lighting2 packet type
     """
 
+    __slots__ = ('id1', 'id2', 'id3', 'id4', 'id_combined', 'unitcode', 'cmnd',
+                 'level')
+
     TYPES = {0x00: 'AC',
              0x01: 'HomeEasy EU',
              0x02: 'ANSLUT',
@@ -345,6 +747,11 @@ class Lighting2(Packet):
     Mapping of command numeric values to strings, used for cmnd_string
     """
 
+    _STRUCT = Struct('>4BI4B')
+
+    _TX_TEMPLATE = bytes(bytearray([0x0b, 0x11] + [0x00] * 10))
+    _TX_STRUCT = Struct('>2BI3B')
+
     def __str__(self):
         return ("Lighting2 [subtype={0}, seqnbr={1}, id={2}, cmnd={3}, " +
                 "level={4}, rssi={5}]") \
@@ -362,7 +769,6 @@ class Lighting2(Packet):
         self.unitcode = None
         self.cmnd = None
         self.level = None
-        self.cmnd_string = None
 
     def parse_id(self, subtype, id_string):
         """Parse a string id into individual components"""
@@ -376,28 +782,22 @@ class Lighting2(Packet):
             self.id4 = self.id_combined & 0xff
             self.unitcode = int(id_string[8:])
             self._set_strings()
+            valid = self.id_string == id_string
         except:
             raise ValueError("Invalid id_string")
-        if self.id_string != id_string:
+        if not valid:
             raise ValueError("Invalid id_string")
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-        self.subtype = data[2]
-        self.seqnbr = data[3]
-        self.id1 = data[4]
-        self.id2 = data[5]
-        self.id3 = data[6]
-        self.id4 = data[7]
-        self.id_combined = (self.id1 << 24) + (self.id2 << 16) \
-            + (self.id3 << 8) + self.id4
-        self.unitcode = data[8]
-        self.cmnd = data[9]
-        self.level = data[10]
-        self.rssi_byte = data[11]
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         self.id_combined, self.unitcode, self.cmnd, self.level,
+         self.rssi_byte) = self._STRUCT.unpack_from(data, offset)
+        self.id1 = self.id_combined >> 24
+        self.id2 = self.id_combined >> 16 & 0xff
+        self.id3 = self.id_combined >> 8 & 0xff
+        self.id4 = self.id_combined & 0xff
         self.rssi = self.rssi_byte >> 4
         self._set_strings()
 
@@ -418,26 +818,45 @@ class Lighting2(Packet):
         self.level = level
         self.rssi_byte = 0
         self.rssi = 0
-        self.data = bytearray([self.packetlength, self.packettype,
-                               self.subtype, self.seqnbr, self.id1, self.id2,
-                               self.id3, self.id4, self.unitcode, self.cmnd,
-                               self.level, self.rssi_byte])
+        self.data = bytearray(len(self._TX_TEMPLATE))
+        self.encode_transmit(self.data, 0, subtype, seqnbr, id_combined,
+                             unitcode, cmnd, level)
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
-        self.id_string = "{0:07x}:{1}".format(self.id_combined, self.unitcode)
-        if self.subtype in self.TYPES:
-            self.type_string = self.TYPES[self.subtype]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = self._UNKNOWN_TYPE.format(self.packettype,
-                                                         self.subtype)
-        if self.cmnd is not None:
-            if self.cmnd in self.COMMANDS:
-                self.cmnd_string = self.COMMANDS[self.cmnd]
-            else:
-                self.cmnd_string = self._UNKNOWN_CMND.format(self.cmnd)
+    @classmethod
+    def encode_transmit(cls, buf, offset, subtype, seqnbr, id_combined,
+                        unitcode, cmnd, level):
+        """Write a packet with the given data fields into buf at offset,
+           returning the number of bytes written"""
+        template = cls._TX_TEMPLATE
+        buf[offset:offset + len(template)] = template
+        try:
+            cls._TX_STRUCT.pack_into(buf, offset + 2, subtype, seqnbr,
+                                     id_combined, unitcode, cmnd, level)
+        except StructError:
+            raise ValueError("Invalid data field")
+        return len(template)
+
+    def _id_key(self):
+        """Return the values that id_string is built from"""
+        return (self.packettype, self.subtype, self.id_combined,
+                self.unitcode)
+
+    def _device_id(self):
+        """Return the raw id fields packed into an integer"""
+        return self.id_combined << 8 | self.unitcode
+
+    def _format_id(self):
+        """Return the id_string for the loaded numeric values"""
+        return "{0:07x}:{1}".format(self.id_combined, self.unitcode)
+
+    def _format_cmnd(self):
+        """Return the cmnd_string for the loaded numeric values"""
+        if self.cmnd is None:
+            return None
+        if self.cmnd in self.COMMANDS:
+            return self.COMMANDS[self.cmnd]
+        return self._UNKNOWN_CMND.format(self.cmnd)
 
 
 ###############################################################################
@@ -449,6 +868,9 @@ class Lighting3(Packet):
     Data class for the Lighting3 packet type
     """
 
+    __slots__ = ('system', 'channel1', 'channel2', 'channel', 'cmnd',
+                 'battery')
+
     TYPES = {0x00: 'Ikea Koppla',
              }
     """
@@ -474,6 +896,12 @@ class Lighting3(Packet):
     Mapping of command numeric values to strings, used for cmnd_string
     """
 
+    # channel1 is the low byte of channel, hence the little endian short
+    _STRUCT = Struct('<5BH2B')
+
+    _TX_TEMPLATE = bytes(bytearray([0x08, 0x12] + [0x00] * 7))
+    _TX_STRUCT = Struct('<3BHB')
+
     def __str__(self):
         return ("Lighting3 [subtype={0}, seqnbr={1}, id={2}, cmnd={3}, " +
                 "battery={4}, rssi={5}]") \
@@ -489,7 +917,6 @@ class Lighting3(Packet):
         self.channel = None
         self.cmnd = None
         self.battery = None
-        self.cmnd_string = None
 
     def parse_id(self, subtype, id_string):
         """Parse a string id into individual components"""
@@ -501,24 +928,20 @@ class Lighting3(Packet):
             self.channel1 = self.channel & 0xff
             self.channel2 = self.channel >> 8
             self._set_strings()
+            valid = self.id_string == id_string
         except:
             raise ValueError("Invalid id_string")
-        if self.id_string != id_string:
+        if not valid:
             raise ValueError("Invalid id_string")
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-        self.subtype = data[2]
-        self.seqnbr = data[3]
-        self.system = data[4]
-        self.channel1 = data[5]
-        self.channel2 = data[6]
-        self.channel = (self.channel2 << 8) + self.channel1
-        self.cmnd = data[7]
-        self.rssi_byte = data[8]
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         self.system, self.channel, self.cmnd,
+         self.rssi_byte) = self._STRUCT.unpack_from(data, offset)
+        self.channel1 = self.channel & 0xff
+        self.channel2 = self.channel >> 8
         self.battery = self.rssi_byte & 0x0f
         self.rssi = self.rssi_byte >> 4
         self._set_strings()
@@ -537,26 +960,44 @@ class Lighting3(Packet):
         self.rssi_byte = 0
         self.battery = 0
         self.rssi = 0
-        self.data = bytearray([self.packetlength, self.packettype,
-                               self.subtype, self.seqnbr, self.system,
-                               self.channel1, self.channel2, self.cmnd,
-                               self.rssi_byte])
+        self.data = bytearray(len(self._TX_TEMPLATE))
+        self.encode_transmit(self.data, 0, subtype, seqnbr, system, channel,
+                             cmnd)
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
-        self.id_string = "{0:1x}:{1:03x}".format(self.system, self.channel)
-        if self.subtype in self.TYPES:
-            self.type_string = self.TYPES[self.subtype]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = self._UNKNOWN_TYPE.format(self.packettype,
-                                                         self.subtype)
-        if self.cmnd is not None:
-            if self.cmnd in self.COMMANDS:
-                self.cmnd_string = self.COMMANDS[self.cmnd]
-            else:
-                self.cmnd_string = self._UNKNOWN_CMND.format(self.cmnd)
+    @classmethod
+    def encode_transmit(cls, buf, offset, subtype, seqnbr, system, channel,
+                        cmnd):
+        """Write a packet with the given data fields into buf at offset,
+           returning the number of bytes written"""
+        template = cls._TX_TEMPLATE
+        buf[offset:offset + len(template)] = template
+        try:
+            cls._TX_STRUCT.pack_into(buf, offset + 2, subtype, seqnbr, system,
+                                     channel, cmnd)
+        except StructError:
+            raise ValueError("Invalid data field")
+        return len(template)
+
+    def _id_key(self):
+        """Return the values that id_string is built from"""
+        return (self.packettype, self.subtype, self.system, self.channel)
+
+    def _device_id(self):
+        """Return the raw id fields packed into an integer"""
+        return self.system << 16 | self.channel
+
+    def _format_id(self):
+        """Return the id_string for the loaded numeric values"""
+        return "{0:1x}:{1:03x}".format(self.system, self.channel)
+
+    def _format_cmnd(self):
+        """Return the cmnd_string for the loaded numeric values"""
+        if self.cmnd is None:
+            return None
+        if self.cmnd in self.COMMANDS:
+            return self.COMMANDS[self.cmnd]
+        return self._UNKNOWN_CMND.format(self.cmnd)
 
 
 ###############################################################################
@@ -568,12 +1009,20 @@ class Lighting4(Packet):
     Data class for the Lighting4 packet type
     """
 
+    __slots__ = ('cmd1', 'cmd2', 'cmd3', 'cmd', 'pulsehigh', 'pulselow',
+                 'pulse')
+
     TYPES = {0x00: 'PT2262',
              }
     """
     Mapping of numeric subtype values to strings, used in type_string
     """
 
+    _STRUCT = Struct('>5BHHB')
+
+    _TX_TEMPLATE = bytes(bytearray([0x09, 0x13] + [0x00] * 8))
+    _TX_STRUCT = Struct('>3B2H')
+
     def __str__(self):
         return ("Lighting4 [subtype={0}, seqnbr={1}, cmd={2}, pulse={3}, " +
                 "rssi={4}]") \
@@ -601,26 +1050,23 @@ class Lighting4(Packet):
             self.cmd2 = (self.cmd >> 8) & 0xff
             self.cmd3 = self.cmd & 0xff
             self._set_strings()
+            valid = self.id_string == id_string
         except:
             raise ValueError("Invalid id_string")
-        if self.id_string != id_string:
+        if not valid:
             raise ValueError("Invalid id_string")
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-        self.subtype = data[2]
-        self.seqnbr = data[3]
-        self.cmd1 = data[4]
-        self.cmd2 = data[5]
-        self.cmd3 = data[6]
-        self.cmd = (self.cmd1 << 16) + (self.cmd2 << 8) + self.cmd3
-        self.pulsehigh = data[7]
-        self.pulselow = data[8]
-        self.pulse = (self.pulsehigh << 8) + self.pulselow
-        self.rssi_byte = data[9]
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         self.cmd1, cmd23, self.pulse,
+         self.rssi_byte) = self._STRUCT.unpack_from(data, offset)
+        self.cmd2 = cmd23 >> 8
+        self.cmd3 = cmd23 & 0xff
+        self.cmd = (self.cmd1 << 16) + cmd23
+        self.pulsehigh = self.pulse >> 8
+        self.pulselow = self.pulse & 0xff
         self.rssi = self.rssi_byte >> 4
         self._set_strings()
 
@@ -639,21 +1085,34 @@ class Lighting4(Packet):
         self.pulselow = self.pulse & 0xff
         self.rssi_byte = 0
         self.rssi = 0
-        self.data = bytearray([self.packetlength, self.packettype,
-                               self.subtype, self.seqnbr,
-                               self.cmd1, self.cmd2, self.cmd3,
-                               self.pulsehigh, self.pulselow, self.rssi_byte])
+        self.data = bytearray(len(self._TX_TEMPLATE))
+        self.encode_transmit(self.data, 0, subtype, seqnbr, cmd, pulse)
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
-        self.id_string = "{0:06x}".format(self.cmd)
-        if self.subtype in self.TYPES:
-            self.type_string = self.TYPES[self.subtype]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = self._UNKNOWN_TYPE.format(self.packettype,
-                                                         self.subtype)
+    @classmethod
+    def encode_transmit(cls, buf, offset, subtype, seqnbr, cmd, pulse):
+        """Write a packet with the given data fields into buf at offset,
+           returning the number of bytes written"""
+        template = cls._TX_TEMPLATE
+        buf[offset:offset + len(template)] = template
+        try:
+            cls._TX_STRUCT.pack_into(buf, offset + 2, subtype, seqnbr,
+                                     cmd >> 16, cmd & 0xffff, pulse)
+        except StructError:
+            raise ValueError("Invalid data field")
+        return len(template)
+
+    def _id_key(self):
+        """Return the values that id_string is built from"""
+        return (self.packettype, self.subtype, self.cmd)
+
+    def _device_id(self):
+        """Return the raw id fields packed into an integer"""
+        return self.cmd
+
+    def _format_id(self):
+        """Return the id_string for the loaded numeric values"""
+        return "{0:06x}".format(self.cmd)
 
 
 ###############################################################################
@@ -665,6 +1124,9 @@ class Lighting5(Packet):
     Data class for the Lighting5 packet type
     """
 
+    __slots__ = ('id1', 'id2', 'id3', 'id_combined', 'unitcode', 'cmnd',
+                 'level')
+
     TYPES = {0x00: 'LightwaveRF, Siemens',
              0x01: 'EMW100 GAO/Everflourish',
              0x02: 'BBSB new types',
@@ -744,6 +1206,11 @@ class Lighting5(Packet):
     Mapping of command numeric values to strings, used for cmnd_string
     """
 
+    _STRUCT = Struct('>4BI3B')
+
+    _TX_TEMPLATE = bytes(bytearray([0x0a, 0x14] + [0x00] * 9))
+    _TX_STRUCT = Struct('>2BH4B')
+
     def __str__(self):
         return ("Lighting5 [subtype={0}, seqnbr={1}, id={2}, cmnd={3}, " +
                 "level={4}, rssi={5}]") \
@@ -760,7 +1227,6 @@ class Lighting5(Packet):
         self.unitcode = None
         self.cmnd = None
         self.level = None
-        self.cmnd_string = None
 
     def parse_id(self, subtype, id_string):
         """Parse a string id into individual components"""
@@ -773,26 +1239,24 @@ class Lighting5(Packet):
             self.id3 = self.id_combined & 0xff
             self.unitcode = int(id_string[7:])
             self._set_strings()
+            valid = self.id_string == id_string
         except:
             raise ValueError("Invalid id_string")
-        if self.id_string != id_string:
+        if not valid:
             raise ValueError("Invalid id_string")
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-        self.subtype = data[2]
-        self.seqnbr = data[3]
-        self.id1 = data[4]
-        self.id2 = data[5]
-        self.id3 = data[6]
-        self.id_combined = (self.id1 << 16) + (self.id2 << 8) + self.id3
-        self.unitcode = data[7]
-        self.cmnd = data[8]
-        self.level = data[9]
-        self.rssi_byte = data[10]
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         id_unitcode, self.cmnd, self.level,
+         self.rssi_byte) = self._STRUCT.unpack_from(data, offset)
+        # the 3 id bytes and the unitcode are read as one 32 bit word
+        self.id_combined = id_unitcode >> 8
+        self.unitcode = id_unitcode & 0xff
+        self.id1 = self.id_combined >> 16
+        self.id2 = self.id_combined >> 8 & 0xff
+        self.id3 = self.id_combined & 0xff
         self.rssi = self.rssi_byte >> 4
         self._set_strings()
 
@@ -812,36 +1276,56 @@ class Lighting5(Packet):
         self.level = level
         self.rssi_byte = 0
         self.rssi = 0
-        self.data = bytearray([self.packetlength, self.packettype,
-                               self.subtype, self.seqnbr, self.id1, self.id2,
-                               self.id3, self.unitcode, self.cmnd,
-                               self.level, self.rssi_byte])
+        self.data = bytearray(len(self._TX_TEMPLATE))
+        self.encode_transmit(self.data, 0, subtype, seqnbr, id_combined,
+                             unitcode, cmnd, level)
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
-        self.id_string = "{0:06x}:{1}".format(self.id_combined, self.unitcode)
-        if self.subtype in self.TYPES:
-            self.type_string = self.TYPES[self.subtype]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = self._UNKNOWN_TYPE.format(self.packettype,
-                                                         self.subtype)
-        if self.cmnd is not None:
-            if self.subtype == 0x00 and self.cmnd in self.COMMANDS_00:
-                self.cmnd_string = self.COMMANDS_00[self.cmnd]
-            elif self.subtype == 0x01 and self.cmnd in self.COMMANDS_01:
-                self.cmnd_string = self.COMMANDS_01[self.cmnd]
-            elif self.subtype == 0x02 and self.cmnd in self.COMMANDS_02_04:
-                self.cmnd_string = self.COMMANDS_02_04[self.cmnd]
-            elif self.subtype == 0x03 and self.cmnd in self.COMMANDS_03:
-                self.cmnd_string = self.COMMANDS_03[self.cmnd]
-            elif self.subtype == 0x04 and self.cmnd in self.COMMANDS_02_04:
-                self.cmnd_string = self.COMMANDS_02_04[self.cmnd]
-            elif self.subtype >= 0x05 and self.cmnd in self.COMMANDS_XX:
-                self.cmnd_string = self.COMMANDS_XX[self.cmnd]
-            else:
-                self.cmnd_string = self._UNKNOWN_CMND.format(self.cmnd)
+    @classmethod
+    def encode_transmit(cls, buf, offset, subtype, seqnbr, id_combined,
+                        unitcode, cmnd, level):
+        """Write a packet with the given data fields into buf at offset,
+           returning the number of bytes written"""
+        template = cls._TX_TEMPLATE
+        buf[offset:offset + len(template)] = template
+        try:
+            cls._TX_STRUCT.pack_into(buf, offset + 2, subtype, seqnbr,
+                                     id_combined >> 8, id_combined & 0xff,
+                                     unitcode, cmnd, level)
+        except StructError:
+            raise ValueError("Invalid data field")
+        return len(template)
+
+    def _id_key(self):
+        """Return the values that id_string is built from"""
+        return (self.packettype, self.subtype, self.id_combined,
+                self.unitcode)
+
+    def _device_id(self):
+        """Return the raw id fields packed into an integer"""
+        return self.id_combined << 8 | self.unitcode
+
+    def _format_id(self):
+        """Return the id_string for the loaded numeric values"""
+        return "{0:06x}:{1}".format(self.id_combined, self.unitcode)
+
+    def _format_cmnd(self):
+        """Return the cmnd_string for the loaded numeric values"""
+        if self.cmnd is None:
+            return None
+        if self.subtype == 0x00 and self.cmnd in self.COMMANDS_00:
+            return self.COMMANDS_00[self.cmnd]
+        elif self.subtype == 0x01 and self.cmnd in self.COMMANDS_01:
+            return self.COMMANDS_01[self.cmnd]
+        elif self.subtype == 0x02 and self.cmnd in self.COMMANDS_02_04:
+            return self.COMMANDS_02_04[self.cmnd]
+        elif self.subtype == 0x03 and self.cmnd in self.COMMANDS_03:
+            return self.COMMANDS_03[self.cmnd]
+        elif self.subtype == 0x04 and self.cmnd in self.COMMANDS_02_04:
+            return self.COMMANDS_02_04[self.cmnd]
+        elif self.subtype >= 0x05 and self.cmnd in self.COMMANDS_XX:
+            return self.COMMANDS_XX[self.cmnd]
+        return self._UNKNOWN_CMND.format(self.cmnd)
 
 
 ###############################################################################
@@ -853,6 +1337,9 @@ class Lighting6(Packet):
     Data class for the Lighting6 packet type
     """
 
+    __slots__ = ('id1', 'id2', 'id_combined', 'groupcode', 'unitcode', 'cmnd',
+                 'cmndseqnbr', 'rfu', 'level')
+
     TYPES = {0x00: 'Blyss',
              }
     """
@@ -868,6 +1355,11 @@ class Lighting6(Packet):
     Mapping of command numeric values to strings, used for cmnd_string
     """
 
+    _STRUCT = Struct('>4BH6B')
+
+    _TX_TEMPLATE = bytes(bytearray([0x0b, 0x15] + [0x00] * 10))
+    _TX_STRUCT = Struct('>2BH4B')
+
     def __str__(self):
         return ("Lighting6 [subtype={0}, seqnbr={1}, id={2}, cmnd={3}, " +
                 "cmndseqnbr={4}, rssi={5}]") \
@@ -886,7 +1378,6 @@ class Lighting6(Packet):
         self.cmndseqnbr = None
         self.rfu = None
         self.level = None
-        self.cmnd_string = None
 
     def parse_id(self, subtype, id_string):
         """Parse a string id into individual components"""
@@ -899,27 +1390,21 @@ class Lighting6(Packet):
             self.groupcode = ord(id_string[5])
             self.unitcode = int(id_string[6:])
             self._set_strings()
+            valid = self.id_string == id_string
         except:
             raise ValueError("Invalid id_string")
-        if self.id_string != id_string:
+        if not valid:
             raise ValueError("Invalid id_string")
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-        self.subtype = data[2]
-        self.seqnbr = data[3]
-        self.id1 = data[4]
-        self.id2 = data[5]
-        self.id_combined = (self.id1 << 8) + self.id2
-        self.groupcode = data[6]
-        self.unitcode = data[7]
-        self.cmnd = data[8]
-        self.cmndseqnbr = data[9]
-        self.rfu = data[10]
-        self.rssi_byte = data[11]
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         self.id_combined, self.groupcode, self.unitcode, self.cmnd,
+         self.cmndseqnbr, self.rfu,
+         self.rssi_byte) = self._STRUCT.unpack_from(data, offset)
+        self.id1 = self.id_combined >> 8
+        self.id2 = self.id_combined & 0xff
         self.rssi = self.rssi_byte >> 4
         self._set_strings()
 
@@ -940,28 +1425,48 @@ class Lighting6(Packet):
         self.rfu = 0
         self.rssi_byte = 0
         self.rssi = 0
-        self.data = bytearray([self.packetlength, self.packettype,
-                               self.subtype, self.seqnbr, self.id1, self.id2,
-                               self.groupcode, self.unitcode, self.cmnd,
-                               self.cmndseqnbr, self.rfu, self.rssi_byte])
+        self.data = bytearray(len(self._TX_TEMPLATE))
+        self.encode_transmit(self.data, 0, subtype, seqnbr, id_combined,
+                             groupcode, unitcode, cmnd, cmndseqnbr)
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
-        self.id_string = "{0:04x}:{1}{2}".format(self.id_combined,
-                                                 chr(self.groupcode),
-                                                 self.unitcode)
-        if self.subtype in self.TYPES:
-            self.type_string = self.TYPES[self.subtype]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = self._UNKNOWN_TYPE.format(self.packettype,
-                                                         self.subtype)
-        if self.cmnd is not None:
-            if self.cmnd in self.COMMANDS:
-                self.cmnd_string = self.COMMANDS[self.cmnd]
-            else:
-                self.cmnd_string = self._UNKNOWN_CMND.format(self.cmnd)
+    @classmethod
+    def encode_transmit(cls, buf, offset, subtype, seqnbr, id_combined,
+                        groupcode, unitcode, cmnd, cmndseqnbr):
+        """Write a packet with the given data fields into buf at offset,
+           returning the number of bytes written"""
+        template = cls._TX_TEMPLATE
+        buf[offset:offset + len(template)] = template
+        try:
+            cls._TX_STRUCT.pack_into(buf, offset + 2, subtype, seqnbr,
+                                     id_combined & 0xffff, groupcode,
+                                     unitcode, cmnd, cmndseqnbr)
+        except StructError:
+            raise ValueError("Invalid data field")
+        return len(template)
+
+    def _id_key(self):
+        """Return the values that id_string is built from"""
+        return (self.packettype, self.subtype, self.id_combined,
+                self.groupcode, self.unitcode)
+
+    def _device_id(self):
+        """Return the raw id fields packed into an integer"""
+        return (self.id_combined << 16 | self.groupcode << 8 |
+                self.unitcode)
+
+    def _format_id(self):
+        """Return the id_string for the loaded numeric values"""
+        return "{0:04x}:{1}{2}".format(self.id_combined,
+                                       chr(self.groupcode), self.unitcode)
+
+    def _format_cmnd(self):
+        """Return the cmnd_string for the loaded numeric values"""
+        if self.cmnd is None:
+            return None
+        if self.cmnd in self.COMMANDS:
+            return self.COMMANDS[self.cmnd]
+        return self._UNKNOWN_CMND.format(self.cmnd)
 
 
 ###############################################################################
@@ -973,6 +1478,8 @@ class SensorPacket(Packet):
     Abstract superclass for all sensor related packets
     """
 
+    __slots__ = ()
+
     HUMIDITY_TYPES = {0x00: 'dry',
                       0x01: 'comfort',
                       0x02: 'normal',
@@ -992,10 +1499,40 @@ class SensorPacket(Packet):
     Mapping of forecast types to string
     """
 
+    @property
+    def humidity_status_string(self):
+        """String describing humidity_status, for packets that have one"""
+        if self.humidity_status is None:
+            return None
+        if self.humidity_status in self.HUMIDITY_TYPES:
+            return self.HUMIDITY_TYPES[self.humidity_status]
+        return self.HUMIDITY_TYPES[-1]
+
+    @property
+    def forecast_string(self):
+        """String describing forecast, for packets that have one"""
+        if self.forecast is None:
+            return None
+        if self.forecast in self.FORECAST_TYPES:
+            return self.FORECAST_TYPES[self.forecast]
+        return self.FORECAST_TYPES[-1]
+
     def __init__(self):
         """Constructor"""
         super(SensorPacket, self).__init__()
 
+    def _id_key(self):
+        """Return the values that id_string is built from"""
+        return (self.packettype, self.subtype, self.id1, self.id2)
+
+    def _device_id(self):
+        """Return the raw id fields packed into an integer"""
+        return self.id1 << 8 | self.id2
+
+    def _format_id(self):
+        """Return the id_string for the loaded numeric values"""
+        return "{0:02x}:{1:02x}".format(self.id1, self.id2)
+
 
 ###############################################################################
 # Temp class
@@ -1006,6 +1543,8 @@ class Temp(SensorPacket):
     Data class for the Temp1 packet type
     """
 
+    __slots__ = ('id1', 'id2', 'temphigh', 'templow', 'temp', 'battery')
+
     TYPES = {0x01: 'THR128/138, THC138',
              0x02: 'THC238/268,THN132,THWR288,THRN122,THN122,AW129/131',
              0x03: 'THWR800',
@@ -1021,6 +1560,8 @@ class Temp(SensorPacket):
     Mapping of numeric subtype values to strings, used in type_string
     """
 
+    _STRUCT = Struct('>6BHB')
+
     def __str__(self):
         return ("Temp [subtype={0}, seqnbr={1}, id={2}, temp={3}, " +
                 "battery={4}, rssi={5}]") \
@@ -1037,35 +1578,21 @@ class Temp(SensorPacket):
         self.temp = None
         self.battery = None
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-        self.subtype = data[2]
-        self.seqnbr = data[3]
-        self.id1 = data[4]
-        self.id2 = data[5]
-        self.temphigh = data[6]
-        self.templow = data[7]
-        self.temp = float(((self.temphigh & 0x7f) << 8) + self.templow) / 10
-        if self.temphigh >= 0x80:
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         self.id1, self.id2, temp,
+         self.rssi_byte) = self._STRUCT.unpack_from(data, offset)
+        self.temphigh = temp >> 8
+        self.templow = temp & 0xff
+        self.temp = float(temp & 0x7fff) / 10
+        if temp & 0x8000:
             self.temp = -self.temp
-        self.rssi_byte = data[8]
         self.battery = self.rssi_byte & 0x0f
         self.rssi = self.rssi_byte >> 4
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
-        self.id_string = "{0:02x}:{1:02x}".format(self.id1, self.id2)
-        if self.subtype in self.TYPES:
-            self.type_string = self.TYPES[self.subtype]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = self._UNKNOWN_TYPE.format(self.packettype,
-                                                         self.subtype)
-
 
 ###############################################################################
 # Humid class
@@ -1076,6 +1603,8 @@ class Humid(SensorPacket):
     Data class for the Humid packet type
     """
 
+    __slots__ = ('id1', 'id2', 'humidity', 'humidity_status', 'battery')
+
     TYPES = {0x01: 'LaCrosse TX3',
              0x02: 'LaCrosse WS2300',
              }
@@ -1083,6 +1612,8 @@ class Humid(SensorPacket):
     Mapping of numeric subtype values to strings, used in type_string
     """
 
+    _STRUCT = Struct('>9B')
+
     def __str__(self):
         return ("Humid [subtype={0}, seqnbr={1}, id={2}, " +
                 "humidity={3}, humidity_status={4}, battery={5}, rssi={6}]") \
@@ -1097,40 +1628,18 @@ class Humid(SensorPacket):
         self.id2 = None
         self.humidity = None
         self.humidity_status = None
-        self.humidity_status_string = None
         self.battery = None
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-        self.subtype = data[2]
-        self.seqnbr = data[3]
-        self.id1 = data[4]
-        self.id2 = data[5]
-        self.humidity = data[6]
-        self.humidity_status = data[7]
-        self.rssi_byte = data[8]
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         self.id1, self.id2, self.humidity, self.humidity_status,
+         self.rssi_byte) = self._STRUCT.unpack_from(data, offset)
         self.battery = self.rssi_byte & 0x0f
         self.rssi = self.rssi_byte >> 4
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
-        self.id_string = "{0:02x}:{1:02x}".format(self.id1, self.id2)
-        if self.subtype in self.TYPES:
-            self.type_string = self.TYPES[self.subtype]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = self._UNKNOWN_TYPE.format(self.packettype,
-                                                         self.subtype)
-        if self.humidity_status in self.HUMIDITY_TYPES:
-            self.humidity_status_string = \
-                self.HUMIDITY_TYPES[self.humidity_status]
-        else:
-            self.humidity_status_string = self.HUMIDITY_TYPES[-1]
-
 
 ###############################################################################
 # TempHumid class
@@ -1141,6 +1650,9 @@ class TempHumid(SensorPacket):
     Data class for the TempHumid packet type
     """
 
+    __slots__ = ('id1', 'id2', 'temphigh', 'templow', 'temp', 'humidity',
+                 'humidity_status', 'battery')
+
     TYPES = {0x01: 'THGN122/123, THGN132, THGR122/228/238/268',
              0x02: 'THGR810, THGN800',
              0x03: 'RTGR328',
@@ -1156,6 +1668,8 @@ class TempHumid(SensorPacket):
     Mapping of numeric subtype values to strings, used in type_string
     """
 
+    _STRUCT = Struct('>6BH3B')
+
     def __str__(self):
         return ("TempHumid [subtype={0}, seqnbr={1}, id={2}, temp={3}, " +
                 "humidity={4}, humidity_status={5}, battery={6}, rssi={7}]") \
@@ -1173,45 +1687,23 @@ class TempHumid(SensorPacket):
         self.temp = None
         self.humidity = None
         self.humidity_status = None
-        self.humidity_status_string = None
         self.battery = None
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-        self.subtype = data[2]
-        self.seqnbr = data[3]
-        self.id1 = data[4]
-        self.id2 = data[5]
-        self.temphigh = data[6]
-        self.templow = data[7]
-        self.temp = float(((self.temphigh & 0x7f) << 8) + self.templow) / 10
-        if self.temphigh >= 0x80:
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         self.id1, self.id2, temp, self.humidity, self.humidity_status,
+         self.rssi_byte) = self._STRUCT.unpack_from(data, offset)
+        self.temphigh = temp >> 8
+        self.templow = temp & 0xff
+        self.temp = float(temp & 0x7fff) / 10
+        if temp & 0x8000:
             self.temp = -self.temp
-        self.humidity = data[8]
-        self.humidity_status = data[9]
-        self.rssi_byte = data[10]
         self.battery = self.rssi_byte & 0x0f
         self.rssi = self.rssi_byte >> 4
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
-        self.id_string = "{0:02x}:{1:02x}".format(self.id1, self.id2)
-        if self.subtype in self.TYPES:
-            self.type_string = self.TYPES[self.subtype]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = self._UNKNOWN_TYPE.format(self.packettype,
-                                                         self.subtype)
-        if self.humidity_status in self.HUMIDITY_TYPES:
-            self.humidity_status_string = \
-                self.HUMIDITY_TYPES[self.humidity_status]
-        else:
-            self.humidity_status_string = self.HUMIDITY_TYPES[-1]
-
 
 ###############################################################################
 # Baro class
@@ -1222,11 +1714,15 @@ class Baro(SensorPacket):
     Data class for the Baro packet type
     """
 
+    __slots__ = ('id1', 'id2', 'baro1', 'baro2', 'baro', 'forecast', 'battery')
+
     TYPES = {}
     """
     Mapping of numeric subtype values to strings, used in type_string
     """
 
+    _STRUCT = Struct('>6BH2B')
+
     def __str__(self):
         return ("Baro [subtype={0}, seqnbr={1}, id={2}, baro={3}, " +
                 "forecast={4}, battery={5}, rssi={6}]") \
@@ -1242,41 +1738,20 @@ class Baro(SensorPacket):
         self.baro2 = None
         self.baro = None
         self.forecast = None
-        self.forecast_string = None
         self.battery = None
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-        self.subtype = data[2]
-        self.seqnbr = data[3]
-        self.id1 = data[4]
-        self.id2 = data[5]
-        self.baro1 = data[6]
-        self.baro2 = data[7]
-        self.baro = (self.baro1 << 8) + self.baro2
-        self.forecast = data[8]
-        self.rssi_byte = data[9]
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         self.id1, self.id2, self.baro, self.forecast,
+         self.rssi_byte) = self._STRUCT.unpack_from(data, offset)
+        self.baro1 = self.baro >> 8
+        self.baro2 = self.baro & 0xff
         self.battery = self.rssi_byte & 0x0f
         self.rssi = self.rssi_byte >> 4
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
-        self.id_string = "{0:02x}:{1:02x}".format(self.id1, self.id2)
-        if self.subtype in self.TYPES:
-            self.type_string = self.TYPES[self.subtype]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = self._UNKNOWN_TYPE.format(self.packettype,
-                                                         self.subtype)
-        if self.forecast in self.FORECAST_TYPES:
-            self.forecast_string = self.FORECAST_TYPES[self.forecast]
-        else:
-            self.forecast_string = self.FORECAST_TYPES[-1]
-
 
 ###############################################################################
 # TempHumidBaro class
@@ -1287,6 +1762,10 @@ class TempHumidBaro(SensorPacket):
     Data class for the TempHumidBaro packet type
     """
 
+    __slots__ = ('id1', 'id2', 'temphigh', 'templow', 'temp', 'humidity',
+                 'humidity_status', 'baro1', 'baro2', 'baro', 'forecast',
+                 'battery')
+
     TYPES = {0x01: 'BTHR918',
              0x02: 'BTHR918N, BTHR968',
              }
@@ -1294,6 +1773,8 @@ class TempHumidBaro(SensorPacket):
     Mapping of numeric subtype values to strings, used in type_string
     """
 
+    _STRUCT = Struct('>6BH2BH2B')
+
     def __str__(self):
         return ("TempHumidBaro [subtype={0}, seqnbr={1}, id={2}, temp={3}, " +
                 "humidity={4}, humidity_status={5}, baro={6}, forecast={7}, " +
@@ -1312,64 +1793,43 @@ class TempHumidBaro(SensorPacket):
         self.temp = None
         self.humidity = None
         self.humidity_status = None
-        self.humidity_status_string = None
         self.baro1 = None
         self.baro2 = None
         self.baro = None
         self.forecast = None
-        self.forecast_string = None
         self.battery = None
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-        self.subtype = data[2]
-        self.seqnbr = data[3]
-        self.id1 = data[4]
-        self.id2 = data[5]
-        self.temphigh = data[6]
-        self.templow = data[7]
-        self.temp = float(((self.temphigh & 0x7f) << 8) + self.templow) / 10
-        if self.temphigh >= 0x80:
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         self.id1, self.id2, temp, self.humidity, self.humidity_status,
+         self.baro, self.forecast,
+         self.rssi_byte) = self._STRUCT.unpack_from(data, offset)
+        self.temphigh = temp >> 8
+        self.templow = temp & 0xff
+        self.temp = float(temp & 0x7fff) / 10
+        if temp & 0x8000:
             self.temp = -self.temp
-        self.humidity = data[8]
-        self.humidity_status = data[9]
-        self.baro1 = data[10]
-        self.baro2 = data[11]
-        self.baro = (self.baro1 << 8) + self.baro2
-        self.forecast = data[12]
-        self.rssi_byte = data[13]
+        self.baro1 = self.baro >> 8
+        self.baro2 = self.baro & 0xff
         self.battery = self.rssi_byte & 0x0f
         self.rssi = self.rssi_byte >> 4
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
-        self.id_string = "{0:02x}:{1:02x}".format(self.id1, self.id2)
-        if self.subtype in self.TYPES:
-            self.type_string = self.TYPES[self.subtype]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = self._UNKNOWN_TYPE.format(self.packettype,
-                                                         self.subtype)
-        if self.humidity_status in self.HUMIDITY_TYPES:
-            self.humidity_status_string = \
-                self.HUMIDITY_TYPES[self.humidity_status]
-        else:
-            self.humidity_status_string = self.HUMIDITY_TYPES[-1]
-        if self.forecast in self.FORECAST_TYPES:
-            self.forecast_string = self.FORECAST_TYPES[self.forecast]
-        else:
-            self.forecast_string = self.FORECAST_TYPES[-1]
-
 
 ###############################################################################
 # Rain class
 ###############################################################################
 
 class Rain(SensorPacket):
+    """
+    Data class for the Rain packet type
+    """
+
+    __slots__ = ('id1', 'id2', 'rainrate1', 'rainrate2', 'rainrate',
+                 'raintotal1', 'raintotal2', 'raintotal3', 'raintotal',
+                 'battery')
 
     TYPES = {
         0x01: "RGR126/682/918",
@@ -1380,6 +1840,10 @@ class Rain(SensorPacket):
         0x06: "La Crosse TX5"
         }
 
+    # raintotal is 3 bytes wide, so it is read as one 32 bit word together
+    # with the rssi byte that follows it
+    _STRUCT = Struct('>6BHI')
+
     def __str__(self):
         return ("Rain [subtype={0}, seqnbr={1}, id={2}, rainrate={3}, " +
                 "raintotal={4}, battery={5}, rssi={6}]") \
@@ -1400,42 +1864,28 @@ class Rain(SensorPacket):
         self.raintotal = None
         self.battery = None
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-        self.subtype = data[2]
-        self.seqnbr = data[3]
-        self.id1 = data[4]
-        self.id2 = data[5]
-        self.rainrate1 = data[6]
-        self.rainrate2 = data[7]
-        self.rainrate = (self.rainrate1 << 8) + self.rainrate2
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         self.id1, self.id2, rainrate,
+         raintotal) = self._STRUCT.unpack_from(data, offset)
+        self.rainrate1 = rainrate >> 8
+        self.rainrate2 = rainrate & 0xff
         if self.subtype == 2:
-            self.rainrate = float(self.rainrate) / 100
-        self.raintotal1 = data[8]
-        self.raintotal2 = data[9]
-        self.raintotal3 = data[10]
-        self.raintotal = float((self.raintotal1 << 16) +
-                               (self.raintotal2 << 8) +
-                               self.raintotal3) / 10
-        self.rssi_byte = data[11]
+            self.rainrate = float(rainrate) / 100
+        else:
+            self.rainrate = rainrate
+        self.rssi_byte = raintotal & 0xff
+        raintotal >>= 8
+        self.raintotal1 = raintotal >> 16
+        self.raintotal2 = raintotal >> 8 & 0xff
+        self.raintotal3 = raintotal & 0xff
+        self.raintotal = float(raintotal) / 10
         self.battery = self.rssi_byte & 0x0f
         self.rssi = self.rssi_byte >> 4
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
-        self.id_string = "{0:02x}:{1:02x}".format(self.id1, self.id2)
-        if self.subtype in self.TYPES:
-            self.type_string = self.TYPES[self.subtype]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = self._UNKNOWN_TYPE.format(self.packettype,
-                                                         self.subtype)
-
-
 
 ###############################################################################
 # Wind class
@@ -1446,6 +1896,9 @@ class Wind(SensorPacket):
     Data class for the Wind packet type
     """
 
+    __slots__ = ('id1', 'id2', 'direction', 'average_speed', 'gust',
+                 'temperature', 'chill', 'battery')
+
     TYPES = {0x01: 'WTGR800',
              0x02: 'WGR800',
              0x03: 'STR918, WGR918, WGR928',
@@ -1457,6 +1910,8 @@ class Wind(SensorPacket):
     Mapping of numeric subtype values to strings, used in type_string
     """
 
+    _STRUCT = Struct('>6BH4B2HB')
+
     def __str__(self):
         return ("Wind [subtype={0}, seqnbr={1}, id={2}, direction={3}, " +
                 "average_speed={4}, gust={5}, temperature={6}, chill={7}, " +
@@ -1478,36 +1933,236 @@ class Wind(SensorPacket):
         self.battery = None
         self.rssi = None
 
-    def load_receive(self, data):
-        """Load data from a bytearray"""
-        self.data = data
-        self.packetlength = data[0]
-        self.packettype = data[1]
-        self.subtype = data[2]
-        self.seqnbr = data[3]
-        self.id1 = data[4]
-        self.id2 = data[5]
-        self.direction = data[6] * 256 + data[7]
-        self.average_speed = data[8] * 256.0 + data[9] / 10.0
-        self.gust = data[10] * 256.0 + data[11] / 10.0
-        self.temperature = (-1 * (data[12] >> 7)) * (
-                (data[12] & 0x7f) * 256.0 + data[13]) / 10.0
-        self.chill = (-1 * (data[14] >> 7)) * (
-                (data[14] & 0x7f) * 256.0 + data[15]) / 10.0
+    def load_receive(self, data, offset=0):
+        """Load data from a bytearray, or from a buffer at the given offset"""
+        self._set_buffer(data, offset)
+        (self.packetlength, self.packettype, self.subtype, self.seqnbr,
+         self.id1, self.id2, self.direction, avhigh, avlow, gusthigh,
+         gustlow, temperature, chill,
+         last) = self._STRUCT.unpack_from(data, offset)
+        self.average_speed = avhigh * 256.0 + avlow / 10.0
+        self.gust = gusthigh * 256.0 + gustlow / 10.0
+        self.temperature = (-1 * (temperature >> 15)) * (
+                temperature & 0x7fff) / 10.0
+        self.chill = (-1 * (chill >> 15)) * (chill & 0x7fff) / 10.0
         if self.subtype == 0x03:
-            self.battery = data[16] + 1 * 10   
+            self.battery = last + 1 * 10
+            self.rssi_byte = None
+            self.rssi = None
         else:
-            self.rssi_byte = data[16]
+            self.rssi_byte = last
             self.battery = self.rssi_byte & 0x0f
             self.rssi = self.rssi_byte >> 4
         self._set_strings()
 
-    def _set_strings(self):
-        """Translate loaded numeric values into convenience strings"""
-        self.id_string = "{0:02x}:{1:02x}".format(self.id1, self.id2)
-        if self.subtype in self.TYPES:
-            self.type_string = self.TYPES[self.subtype]
-        else:
-            #Degrade nicely for yet unknown subtypes
-            self.type_string = self._UNKNOWN_TYPE.format(self.packettype,
-                                                         self.subtype)
+
+###############################################################################
+# Packet type registry
+###############################################################################
+
+PACKET_TYPES = {0x01: Status,
+                0x02: TransmitterResponse,
+                0x10: Lighting1,
+                0x11: Lighting2,
+                0x12: Lighting3,
+                0x13: Lighting4,
+                0x14: Lighting5,
+                0x15: Lighting6,
+                0x50: Temp,
+                0x51: Humid,
+                0x52: TempHumid,
+                0x53: Baro,
+                0x54: TempHumidBaro,
+                0x55: Rain,
+                0x56: Wind,
+                }
+"""
+Mapping of packettype values to the Packet subclass that decodes them, used
+by parse(). Use register_packet_type() to add support for other packet types.
+"""
+
+PACKET_LENGTHS = {0x02: 0x04,
+                  0x10: 0x07,
+                  0x11: 0x0b,
+                  0x12: 0x08,
+                  0x13: 0x09,
+                  0x14: 0x0a,
+                  0x15: 0x0b,
+                  0x50: 0x08,
+                  0x51: 0x08,
+                  0x52: 0x0a,
+                  0x53: 0x09,
+                  0x54: 0x0d,
+                  0x55: 0x0b,
+                  0x56: 0x10,
+                  }
+"""
+Mapping of packettype values to the packetlength that all packets of that
+type have. The length of Status packets depends on the firmware version, so
+it is not listed.
+"""
+
+PACKET_MIN_LENGTHS = {0x01: 0x09,
+                      }
+"""
+Mapping of packettype values that are not in PACKET_LENGTHS to the minimum
+packetlength that their Packet subclass can decode.
+"""
+
+PACKET_MAX_LENGTHS = {0x01: 0x14,
+                      }
+"""
+Mapping of packettype values that are not in PACKET_LENGTHS to the maximum
+packetlength that the RFXtrx sends, so that a corrupted length byte does
+not make parse() or StreamFramer accept a huge frame.
+"""
+
+
+###############################################################################
+# Batch decoding
+###############################################################################
+
+def parse_batch(buffer):
+    """ Decode a buffer of concatenated, length prefixed sensor frames into
+        columns. Returns a dict mapping each packettype in _BATCH_DECODERS
+        that occurs in the buffer to a NumPy structured array with one row
+        per frame. Null bytes between frames are skipped, as are frames of
+        other packet types, frames with an unexpected length and a truncated
+        frame at the end of the buffer.
+
+        The values are calculated exactly like load_receive() does; id holds
+        id1 and id2 as one 16 bit number, and rssi is -1 where the frame does
+        not report it. Requires NumPy.
+    """
+    import numpy
+
+    data = memoryview(buffer).cast('B')
+    end = len(data)
+    offsets = {}
+    pos = 0
+    while pos < end:
+        length = data[pos]
+        if length == 0:
+            pos += 1
+            continue
+        if pos + length >= end:
+            break
+        packettype = data[pos + 1]
+        decoder = _BATCH_DECODERS.get(packettype)
+        if decoder is not None and length == decoder[0]:
+            offsets.setdefault(packettype, []).append(pos)
+        pos += length + 1
+
+    frames = numpy.frombuffer(data, dtype=numpy.uint8)
+    result = {}
+    for packettype, starts in offsets.items():
+        length, dtype, decode = _BATCH_DECODERS[packettype]
+        # one row of length + 1 bytes per frame
+        rows = frames[numpy.array(starts)[:, None] +
+                      numpy.arange(length + 1)].astype(numpy.int64)
+        array = numpy.zeros(len(starts), dtype=dtype)
+        array['subtype'] = rows[:, 2]
+        array['seqnbr'] = rows[:, 3]
+        array['id'] = (rows[:, 4] << 8) + rows[:, 5]
+        array['battery'] = rows[:, length] & 0x0f
+        array['rssi'] = rows[:, length] >> 4
+        decode(numpy, rows, array)
+        result[packettype] = array
+    return result
+
+
+def _batch_temp(numpy, values):
+    """ Decode the sign and magnitude temperature in values """
+    temp = (values & 0x7fff) / 10.0
+    return numpy.where(values & 0x8000, -temp, temp)
+
+
+def _batch_decode_temp(numpy, rows, array):
+    """ Fill the Temp specific columns of array """
+    array['temp'] = _batch_temp(numpy, (rows[:, 6] << 8) + rows[:, 7])
+
+
+def _batch_decode_humid(numpy, rows, array):
+    """ Fill the Humid specific columns of array """
+    array['humidity'] = rows[:, 6]
+    array['humidity_status'] = rows[:, 7]
+
+
+def _batch_decode_temphumid(numpy, rows, array):
+    """ Fill the TempHumid specific columns of array """
+    array['temp'] = _batch_temp(numpy, (rows[:, 6] << 8) + rows[:, 7])
+    array['humidity'] = rows[:, 8]
+    array['humidity_status'] = rows[:, 9]
+
+
+def _batch_decode_baro(numpy, rows, array):
+    """ Fill the Baro specific columns of array """
+    array['baro'] = (rows[:, 6] << 8) + rows[:, 7]
+    array['forecast'] = rows[:, 8]
+
+
+def _batch_decode_temphumidbaro(numpy, rows, array):
+    """ Fill the TempHumidBaro specific columns of array """
+    array['temp'] = _batch_temp(numpy, (rows[:, 6] << 8) + rows[:, 7])
+    array['humidity'] = rows[:, 8]
+    array['humidity_status'] = rows[:, 9]
+    array['baro'] = (rows[:, 10] << 8) + rows[:, 11]
+    array['forecast'] = rows[:, 12]
+
+
+def _batch_decode_rain(numpy, rows, array):
+    """ Fill the Rain specific columns of array """
+    rainrate = ((rows[:, 6] << 8) + rows[:, 7]).astype(numpy.float64)
+    array['rainrate'] = numpy.where(rows[:, 2] == 2, rainrate / 100, rainrate)
+    array['raintotal'] = ((rows[:, 8] << 16) + (rows[:, 9] << 8) +
+                          rows[:, 10]) / 10.0
+
+
+def _batch_decode_wind(numpy, rows, array):
+    """ Fill the Wind specific columns of array """
+    array['direction'] = (rows[:, 6] << 8) + rows[:, 7]
+    array['average_speed'] = rows[:, 8] * 256.0 + rows[:, 9] / 10.0
+    array['gust'] = rows[:, 10] * 256.0 + rows[:, 11] / 10.0
+    array['temperature'] = (-1 * (rows[:, 12] >> 7)) * (
+        (rows[:, 12] & 0x7f) * 256.0 + rows[:, 13]) / 10.0
+    array['chill'] = (-1 * (rows[:, 14] >> 7)) * (
+        (rows[:, 14] & 0x7f) * 256.0 + rows[:, 15]) / 10.0
+    # subtype 0x03 reports a battery level instead of battery and rssi
+    subtype3 = rows[:, 2] == 0x03
+    array['battery'] = numpy.where(subtype3, rows[:, 16] + 1 * 10,
+                                   array['battery'])
+    array['rssi'] = numpy.where(subtype3, -1, array['rssi'])
+
+
+_BATCH_COLUMNS = [('subtype', 'u1'), ('seqnbr', 'u1'), ('id', 'u2')]
+_BATCH_STATUS = [('battery', 'i2'), ('rssi', 'i1')]
+
+_BATCH_DECODERS = {
+    0x50: (0x08, _BATCH_COLUMNS + [('temp', 'f8')] + _BATCH_STATUS,
+           _batch_decode_temp),
+    0x51: (0x08, _BATCH_COLUMNS + [('humidity', 'u1'),
+                                   ('humidity_status', 'u1')] + _BATCH_STATUS,
+           _batch_decode_humid),
+    0x52: (0x0a, _BATCH_COLUMNS + [('temp', 'f8'), ('humidity', 'u1'),
+                                   ('humidity_status', 'u1')] + _BATCH_STATUS,
+           _batch_decode_temphumid),
+    0x53: (0x09, _BATCH_COLUMNS + [('baro', 'u2'),
+                                   ('forecast', 'u1')] + _BATCH_STATUS,
+           _batch_decode_baro),
+    0x54: (0x0d, _BATCH_COLUMNS + [('temp', 'f8'), ('humidity', 'u1'),
+                                   ('humidity_status', 'u1'), ('baro', 'u2'),
+                                   ('forecast', 'u1')] + _BATCH_STATUS,
+           _batch_decode_temphumidbaro),
+    0x55: (0x0b, _BATCH_COLUMNS + [('rainrate', 'f8'),
+                                   ('raintotal', 'f8')] + _BATCH_STATUS,
+           _batch_decode_rain),
+    0x56: (0x10, _BATCH_COLUMNS + [('direction', 'u2'),
+                                   ('average_speed', 'f8'), ('gust', 'f8'),
+                                   ('temperature', 'f8'),
+                                   ('chill', 'f8')] + _BATCH_STATUS,
+           _batch_decode_wind),
+}
+"""
+Mapping of packettype values to the frame length, NumPy dtype and column
+decoder used by parse_batch()
+"""
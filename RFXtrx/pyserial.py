@@ -21,49 +21,187 @@
 This module provides a transport for PySerial
 """
 
-from serial import Serial
+import io
+import os
+import threading
+from select import select
+from serial import Serial, SerialException
 from time import sleep
-from . import RFXtrxTransport
+try:
+    from queue import Queue, Empty, Full
+except ImportError:  # Python 2
+    from Queue import Queue, Empty, Full
+from . import _FramedTransport
 
+_RESET = bytearray([0x0D] + [0x00] * 13)
+_GET_STATUS = bytearray([0x0D, 0x00, 0x00, 0x01, 0x02] + [0x00] * 9)
 
-class PySerialTransport(RFXtrxTransport):
-    """ Implementation of a transport using PySerial """
+# put in the queue when the reader thread ends
+_STOPPED = object()
 
-    def __init__(self, port, debug=False):
+
+class PySerialTransport(_FramedTransport):
+    """ Implementation of a transport using PySerial
+
+        On POSIX systems, receive_blocking() waits on the file descriptor of
+        the port and reads all available data at once into a reused buffer.
+        Elsewhere it polls PySerial with a timeout.
+
+        After start_reader(), a thread reads from the port continuously,
+        and events are taken from its queue with get(), receive_blocking()
+        or by iterating over the transport. send() can be called from any
+        thread.
+    """
+
+    def __init__(self, port, debug=False, buffer_size=4096):
+        super(PySerialTransport, self).__init__()
         self.serial = Serial(port, 38400, timeout=0.1)
         self.debug = debug
+        self._send_lock = threading.Lock()
+        # see start_reader()
+        self.queue = None
+        self.dropped = 0
+        self._reader = None
+        self._reader_error = None
+        self._stopping = False
+        self._wakeup = None
+        if os.name == 'posix':
+            self.serial.timeout = 0
+            self._file = io.FileIO(self.serial.fileno(), 'r', closefd=False)
+            self._buffer = bytearray(buffer_size)
+            self._view = memoryview(self._buffer)
+            self._waitables = [self._file]
+        else:
+            self._file = None
+
+    def _read_frames(self):
+        """ Wait for data from the port, and return the frames it completes """
+        if self._file is None:
+            # read everything that is waiting, or wait for a single byte
+            data = self.serial.read(self.serial.inWaiting() or 1)
+            return self.framer.feed(data)
+        if self._file not in select(self._waitables, [], [])[0]:
+            return []
+        count = self._file.readinto(self._buffer)
+        if count is None:
+            return []
+        if count == 0:
+            raise SerialException("Port ready to read but returned no data, "
+                                  "device disconnected?")
+        return self.framer.feed(self._view[:count])
 
     def receive_blocking(self):
         """ Wait until a packet is received and return with an RFXtrxEvent """
-        while True:
-            data = self.serial.read()
-            if (len(data) > 0):
-                if data == '\x00':
-                    continue
-                pkt = bytearray(data)
-                data = self.serial.read(pkt[0])
-                pkt.extend(bytearray(data))
-                if self.debug:
-                    print("Recv: " + " ".join("0x{0:02x}".format(x)
-                                              for x in pkt))
-                return self.parse(pkt)
-
-    def send(self, data):
-        """ Send the given packet """
-        if isinstance(data, bytearray):
-            pkt = data
-        elif isinstance(data, str) or isinstance(data, bytes):
-            pkt = bytearray(data)
-        else:
-            raise ValueError("Invalid type")
+        if self._reader is not None:
+            return self.get()
+        return super(PySerialTransport, self).receive_blocking()
+
+    def _write(self, data):
+        """ Write data to the port """
         if self.debug:
-            print ("Send: " + " ".join("0x{0:02x}".format(x) for x in pkt))
-        self.serial.write(pkt)
+            print ("Send: " + " ".join("0x{0:02x}".format(x) for x in data))
+        with self._send_lock:
+            self.serial.write(data)
 
     def reset(self):
         """ Reset the RFXtrx """
-        self.send('\x0D\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00')
+        self.send(_RESET)
         sleep(0.3)  # Should work with 0.05, but not for me
         self.serial.flushInput()
-        self.send('\x0D\x00\x00\x01\x02\x00\x00\x00\x00\x00\x00\x00\x00\x00')
+        self.framer.clear()
+        self.frames.clear()
+        self.send(_GET_STATUS)
         return self.receive_blocking()
+
+    def start_reader(self, queue_size=1000):
+        """ Start a thread that reads from the port continuously, and puts
+            the events in a queue of at most queue_size events. When the
+            queue is full, the oldest event is dropped and counted in
+            dropped, so a slow consumer does not delay the reception of
+            new events. Call reset() before this, and do not set
+            reuse_objects.
+        """
+        self.queue = Queue(queue_size)
+        self._reader_error = None
+        self._stopping = False
+        if self._file is not None:
+            # written to by stop_reader() to wake up the thread
+            self._wakeup = os.pipe()
+            self._waitables = [self._file, self._wakeup[0]]
+        self._reader = threading.Thread(target=self._run_reader,
+                                        name='RFXtrx reader')
+        self._reader.daemon = True
+        self._reader.start()
+
+    def stop_reader(self):
+        """ Stop the thread started by start_reader(). Events still in the
+            queue can be taken with get() until it returns None. Does nothing
+            if the thread is not running
+        """
+        if self._reader is None:
+            return
+        self._stopping = True
+        if self._wakeup is not None:
+            os.write(self._wakeup[1], b'\x00')
+        self._reader.join()
+        self._reader = None
+        if self._wakeup is not None:
+            self._waitables = [self._file]
+            os.close(self._wakeup[0])
+            os.close(self._wakeup[1])
+            self._wakeup = None
+
+    def get(self, timeout=None):
+        """ Return the next event from the reader thread, waiting at most
+            timeout seconds if given, or None if there is no event in time.
+            Returns None as well once the queue is empty after the thread has
+            ended, or raises the exception that ended it
+        """
+        try:
+            event = self.queue.get(timeout=timeout)
+        except Empty:
+            return None
+        if event is _STOPPED:
+            # leave it for the next call
+            self.queue.put(_STOPPED)
+            if self._reader_error is not None:
+                raise self._reader_error  # pylint: disable=E0702
+            return None
+        return event
+
+    def __iter__(self):
+        """ Iterate over the events from the reader thread, until it ends """
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    def _put(self, event):
+        """ Put event in the queue, dropping the oldest event if it is full """
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except Empty:
+                    pass
+
+    def _run_reader(self):
+        """ Body of the reader thread """
+        try:
+            while not self._stopping:
+                for pkt in self._read_frames():
+                    if self.debug:
+                        print("Recv: " + " ".join("0x{0:02x}".format(x)
+                                                  for x in pkt))
+                    event = self.parse(pkt)
+                    if event is not None:
+                        self._put(event)
+        except Exception as exc:  # pylint: disable=W0703
+            self._reader_error = exc
+        finally:
+            self._put(_STOPPED)
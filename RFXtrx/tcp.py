@@ -0,0 +1,168 @@
+# This file is part of pyRFXtrx, a Python library to communicate with
+# the RFXtrx family of devices from http://www.rfxcom.com/
+# See https://github.com/woudt/pyRFXtrx for the latest version.
+#
+# Copyright (C) 2012  Edwin Woudt <edwin@woudt.nl>
+#
+# pyRFXtrx is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyRFXtrx is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pyRFXtrx.  See the file COPYING.txt in the distribution.
+# If not, see <http://www.gnu.org/licenses/>.
+"""
+This module provides a transport for an RFXtrx reached over TCP, like the
+RFXtrx LAN interface or a serial port shared with ser2net
+"""
+
+import errno
+import socket
+import threading
+from time import sleep
+
+from . import _FramedTransport
+
+_RESET = bytearray([0x0D] + [0x00] * 13)
+_GET_STATUS = bytearray([0x0D, 0x00, 0x00, 0x01, 0x02] + [0x00] * 9)
+
+# keepalive options that are not available on every platform, with the
+# number of seconds of idle time, the interval and the number of probes
+_KEEPALIVE_OPTIONS = ('TCP_KEEPIDLE', 'TCP_KEEPINTVL', 'TCP_KEEPCNT')
+
+
+class TcpTransport(_FramedTransport):
+    """ Implementation of a transport over a TCP connection
+
+        The connection is opened once and reused for all packets. It has
+        TCP_NODELAY set, so that a packet is sent without waiting for more
+        data, and keepalive probes after keepalive seconds of idle time, so
+        that a dead connection is noticed. When the connection is lost, it
+        is opened again by the next receive_blocking() or send(), after
+        reconnect_delay seconds; a frame that was partially received is
+        dropped. connects counts the connections opened.
+    """
+
+    def __init__(self, host, port=10001, debug=False, timeout=10,
+                 keepalive=60, reconnect_delay=1, buffer_size=4096):
+        super(TcpTransport, self).__init__()
+        self.address = (host, port)
+        self.debug = debug
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self.reconnect_delay = reconnect_delay
+        self.socket = None
+        self.connects = 0
+        self._connect_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self.connect()
+
+    def connect(self):
+        """ Open the connection, closing the current one if open """
+        with self._connect_lock:
+            self._connect()
+
+    def _connect(self):
+        """ Open the connection, with _connect_lock held """
+        self.close()
+        sock = socket.create_connection(self.address, self.timeout)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.keepalive:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            values = (self.keepalive, max(self.keepalive // 4, 1), 4)
+            for name, value in zip(_KEEPALIVE_OPTIONS, values):
+                if hasattr(socket, name):
+                    sock.setsockopt(socket.IPPROTO_TCP,
+                                    getattr(socket, name), value)
+        self.framer.clear()
+        self.frames.clear()
+        self.socket = sock
+        self.connects += 1
+
+    def _connected(self):
+        """ Return the socket, opening the connection again if it was lost """
+        sock = self.socket
+        if sock is not None:
+            return sock
+        with self._connect_lock:
+            if self.socket is None:
+                sleep(self.reconnect_delay)
+                self._connect()
+            return self.socket
+
+    def _lost(self, sock):
+        """ Forget the connection of sock, if it is still the current one """
+        with self._connect_lock:
+            if self.socket is sock:
+                self.socket = None
+        sock.close()
+
+    def close(self):
+        """ Close the connection """
+        sock, self.socket = self.socket, None
+        if sock is not None:
+            sock.close()
+
+    def _read_frames(self):
+        """ Wait for data from the connection, and return the frames it
+            completes
+        """
+        sock = self._connected()
+        try:
+            count = sock.recv_into(self._buffer)
+        except socket.error as exc:
+            if exc.args and exc.args[0] == errno.EINTR:
+                return []
+            count = 0
+        if count == 0:
+            self._lost(sock)
+            return []
+        return self.framer.feed(self._view[:count])
+
+    def _write(self, data):
+        """ Write data to the connection, and open it again once if that
+            fails
+        """
+        if self.debug:
+            print("Send: " + " ".join("0x{0:02x}".format(x) for x in data))
+        with self._send_lock:
+            sock = self._connected()
+            try:
+                sock.sendall(data)
+            except socket.error:
+                self._lost(sock)
+                self._connected().sendall(data)
+
+    def _discard_input(self):
+        """ Discard the data received so far """
+        sock = self._connected()
+        sock.setblocking(False)
+        try:
+            while sock.recv_into(self._buffer):
+                pass
+            closed = True
+        except socket.error:
+            closed = False
+        sock.setblocking(True)
+        if closed:
+            # an orderly shutdown by the other side
+            self._lost(sock)
+        self.framer.clear()
+        self.frames.clear()
+
+    def reset(self):
+        """ Reset the RFXtrx """
+        self.send(_RESET)
+        sleep(0.3)  # Should work with 0.05, but not for me
+        self._discard_input()
+        self.send(_GET_STATUS)
+        return self.receive_blocking()
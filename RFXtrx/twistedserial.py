@@ -23,11 +23,22 @@ with the Twisted framework
 """
 # pylint: disable=C0103,E0611,E1101,F0401
 
+import threading
+from collections import deque
+
 from twisted.internet import reactor
+from twisted.internet.defer import Deferred
+from twisted.internet.interfaces import IPushProducer
 from twisted.internet.protocol import Protocol
 from twisted.internet.serialport import SerialPort
+from twisted.python.threadable import isInIOThread
+from zope.interface import implementer
 
 from . import RFXtrxTransport
+from .lowlevel import StreamFramer
+
+_RESET = bytearray([0x0D] + [0x00] * 13)
+_GET_STATUS = bytearray([0x0D, 0x00, 0x00, 0x01, 0x02] + [0x00] * 9)
 
 
 class FixedSerialPort(SerialPort):
@@ -40,19 +51,20 @@ class _TwistedSerialProtocol(Protocol):
         TwistedSerialTransport
     """
 
-    def __init__(self, receive_callback, reset_callback, disconnected_callback):
+    def __init__(self, receive_callback, reset_callback, disconnected_callback,
+                 rejected=None):
         self.receive_callback = receive_callback
         self.reset_callback = reset_callback
         self.disconnected_callback = disconnected_callback
-        self.buffer = bytearray([])
+        self.framer = StreamFramer(rejected)
 
     def dataReceived(self, data):
-        """ Called by Twisted when data is received """
-        bdata = bytearray(data)
-        self.buffer.extend(bdata)
-        if len(self.buffer) == self.buffer[0] + 1:
-            self.receive_callback(self.buffer)
-            self.buffer = bytearray([])
+        """ Called by Twisted when data is received, passes all frames it
+            completes at once
+        """
+        frames = self.framer.feed(data)
+        if frames:
+            self.receive_callback(frames)
 
     def connectionMade(self):
         """ Called by Twisted when the connection is made """
@@ -62,38 +74,155 @@ class _TwistedSerialProtocol(Protocol):
         if self.disconnected_callback:
             self.disconnected_callback()
 
+@implementer(IPushProducer)
 class TwistedSerialTransport(RFXtrxTransport):
-    """ Transport implementation for the Twisted framework """
+    """ Transport implementation for the Twisted framework
+
+        receive_callback is called with every event, or when batch is set,
+        once with the list of events of every chunk of data read from the
+        port (do not set reuse_objects then). When receive_callback returns
+        a Deferred, the event counts as being processed until it fires, and
+        reading from the port is paused while max_outstanding events are
+        being processed.
 
-    def __init__(self, port, receive_callback, disconnected_callback=None, debug=False):
+        The transport is an IPushProducer, so that a consumer that falls
+        behind can pause reading from the port with pauseProducing().
+
+        send() can be called from any thread. Outside the reactor thread,
+        packets are queued and written from the reactor with callFromThread,
+        all packets queued until then at once.
+    """
+
+    def __init__(self, port, receive_callback, disconnected_callback=None,
+                 debug=False, batch=False, max_outstanding=100):
+        super(TwistedSerialTransport, self).__init__()
         self.debug = debug
         self.receive_callback = receive_callback
+        self.batch = batch
+        self.max_outstanding = max_outstanding
+        self.outstanding = 0
+        # reasons for which reading is paused, see _pause()
+        self._pauses = set()
+        self._send_queue = deque()
+        self._send_queue_lock = threading.Lock()
         self.protocol = _TwistedSerialProtocol(self._receive,
             self._reset,
-            disconnected_callback)
+            disconnected_callback, self.rejected)
         self.port = port
-        self.serial = FixedSerialPort(self.protocol, self.port, reactor)
-        self.serial.setBaudRate(38400)
+        self.serial = FixedSerialPort(self.protocol, self.port, reactor,
+                                      baudrate=38400)
 
-    def _receive(self, data):
-        """ Handle a received packet """
-        if self.debug:
-            print("Recv: " + " ".join("0x{0:02x}".format(x) for x in data))
-        pkt = self.parse(data)
-        self.receive_callback(pkt)
+    def _receive(self, frames):
+        """ Handle the packets of a chunk of received data """
+        events = []
+        for data in frames:
+            if self.debug:
+                print("Recv: " + " ".join("0x{0:02x}".format(x)
+                                          for x in data))
+            event = self.parse(data)
+            if event is not None:
+                events.append(event)
+        if not events:
+            return
+        if self.batch:
+            self._track(self.receive_callback(events), len(events))
+        else:
+            for event in events:
+                self._track(self.receive_callback(event), 1)
+
+    def _track(self, result, count):
+        """ Count count events as outstanding until result fires, if it is
+            a Deferred
+        """
+        if not isinstance(result, Deferred):
+            return
+        self.outstanding += count
+        if self.outstanding >= self.max_outstanding:
+            self._pause('outstanding')
+
+        def processed(value):
+            self.outstanding -= count
+            if self.outstanding <= self.max_outstanding // 2:
+                self._resume('outstanding')
+            return value
+        result.addBoth(processed)
+
+    def _pause(self, reason):
+        """ Pause reading from the port for reason """
+        if not self._pauses:
+            self.serial.pauseProducing()
+        self._pauses.add(reason)
+
+    def _resume(self, reason):
+        """ Resume reading from the port when reason was the last reason to
+            pause it
+        """
+        if reason in self._pauses:
+            self._pauses.remove(reason)
+            if not self._pauses:
+                self.serial.resumeProducing()
+
+    def pauseProducing(self):
+        """ Pause reading from the port, see IPushProducer """
+        self._pause('consumer')
+
+    def resumeProducing(self):
+        """ Resume reading from the port, see IPushProducer """
+        self._resume('consumer')
+
+    def stopProducing(self):
+        """ Close the port, see IPushProducer """
+        self.serial.loseConnection()
 
     def send(self, data):
         """ Send the given packet """
+        if isinstance(data, (bytearray, memoryview)):
+            pkt = data
+        elif isinstance(data, str) or isinstance(data, bytes):
+            pkt = bytearray(data)
+        else:
+            raise ValueError("Invalid type")
+        if not isInIOThread():
+            with self._send_queue_lock:
+                # copied, as the caller may change data once we return
+                self._send_queue.append(bytearray(pkt))
+                first = len(self._send_queue) == 1
+            if first:
+                reactor.callFromThread(self._send_queued)
+        elif self.write_window is not None:
+            self._buffer_write(pkt)
+        else:
+            self._write(pkt)
+
+    def _send_queued(self):
+        """ Send the packets queued by send() outside the reactor thread """
+        with self._send_queue_lock:
+            frames = list(self._send_queue)
+            self._send_queue.clear()
+        if self.write_window is not None:
+            for pkt in frames:
+                self._buffer_write(pkt)
+        else:
+            self.send_many(frames)
+
+    def _write(self, data):
+        """ Write data to the port """
         if self.debug:
-            bdata = bytearray(data)
-            print ("Send: " + " ".join("0x{0:02x}".format(x) for x in bdata))
-        self.protocol.transport.write(str(data))
+            print ("Send: " + " ".join("0x{0:02x}".format(x) for x in data))
+        self.protocol.transport.write(bytes(data))
+
+    def _call_later(self, delay, function):
+        """ Call function from the reactor after delay seconds """
+        if isInIOThread():
+            reactor.callLater(delay, function)
+        else:
+            reactor.callFromThread(reactor.callLater, delay, function)
 
     def _reset(self):
         """ Reset the RFXtrx """
-        self.send('\x0D\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00')
+        self.send(_RESET)
         reactor.callLater(0.3, self._get_status)
 
     def _get_status(self):
         """ Get the status of the RFXtrx after a reset """
-        self.send('\x0D\x00\x00\x01\x02\x00\x00\x00\x00\x00\x00\x00\x00\x00')
+        self.send(_GET_STATUS)
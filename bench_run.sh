@@ -0,0 +1,5 @@
+#!/bin/sh
+
+PYTHONPATH=. python benchmark/decode.py
+PYTHONPATH=. python benchmark/memory.py
+PYTHONPATH=. python benchmark/encode.py
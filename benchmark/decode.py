@@ -0,0 +1,72 @@
+# This file is part of pyRFXtrx, a Python library to communicate with
+# the RFXtrx family of devices from http://www.rfxcom.com/
+# See https://github.com/woudt/pyRFXtrx for the latest version.
+#
+# Copyright (C) 2012  Edwin Woudt <edwin@woudt.nl>
+#
+# pyRFXtrx is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyRFXtrx is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pyRFXtrx.  See the file COPYING.txt in the distribution.
+# If not, see <http://www.gnu.org/licenses/>.
+"""
+Measure how many frames per second lowlevel.parse() decodes for each of the
+common packet types. The second column only times load_receive() on an
+existing packet instance, leaving out object construction.
+"""
+
+from timeit import repeat
+
+from RFXtrx import lowlevel
+
+FRAMES = [
+    ('Lighting1', [0x07, 0x10, 0x00, 0x2a, 0x45, 0x05, 0x01, 0x70]),
+    ('Lighting2', [0x0b, 0x11, 0x00, 0x2a, 0x01, 0x23, 0x45, 0x67, 0x05,
+                   0x02, 0x08, 0x70]),
+    ('Lighting3', [0x08, 0x12, 0x00, 0x2a, 0x01, 0x34, 0x02, 0x15, 0x79]),
+    ('Lighting4', [0x09, 0x13, 0x00, 0x2a, 0x12, 0x34, 0x56, 0x01, 0x5e,
+                   0x70]),
+    ('Lighting5', [0x0a, 0x14, 0x00, 0x2a, 0x12, 0x34, 0x56, 0x07, 0x10,
+                   0x11, 0x70]),
+    ('Lighting6', [0x0b, 0x15, 0x00, 0x2a, 0x12, 0x34, 0x41, 0x05, 0x03,
+                   0x01, 0x00, 0x70]),
+    ('Temp', [0x08, 0x50, 0x02, 0x2a, 0x96, 0x03, 0x81, 0x41, 0x79]),
+    ('TempHumid', [0x0a, 0x52, 0x01, 0x2a, 0x96, 0x03, 0x81, 0x41, 0x60,
+                   0x03, 0x79]),
+    ('TempHumidBaro', [0x0d, 0x54, 0x01, 0x2a, 0x96, 0x03, 0x81, 0x41, 0x60,
+                       0x03, 0x04, 0x06, 0x00, 0x79]),
+    ('Rain', [0x0b, 0x55, 0x02, 0x03, 0x12, 0x34, 0x02, 0x50, 0x01, 0x23,
+              0x45, 0x57]),
+    ('Wind', [0x10, 0x56, 0x01, 0x03, 0x2F, 0x00, 0x00, 0xF7, 0x00, 0x20,
+              0x00, 0x24, 0x81, 0x60, 0x82, 0x50, 0x59]),
+]
+
+NUMBER = 20000
+REPEAT = 5
+
+
+def main():
+    """ Print the decode rates for every frame in FRAMES """
+    print("{0:<15} {1:>12} {2:>12}".format('frames/sec', 'parse',
+                                            'load_receive'))
+    for name, frame in FRAMES:
+        data = bytearray(frame)
+        pkt = lowlevel.parse(data)
+        parse = min(repeat(lambda: lowlevel.parse(data),
+                           number=NUMBER, repeat=REPEAT))
+        load = min(repeat(lambda: pkt.load_receive(data),
+                          number=NUMBER, repeat=REPEAT))
+        print("{0:<15} {1:>12.0f} {2:>12.0f}".format(name, NUMBER / parse,
+                                                      NUMBER / load))
+
+
+if __name__ == '__main__':
+    main()
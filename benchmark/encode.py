@@ -0,0 +1,74 @@
+# This file is part of pyRFXtrx, a Python library to communicate with
+# the RFXtrx family of devices from http://www.rfxcom.com/
+# See https://github.com/woudt/pyRFXtrx for the latest version.
+#
+# Copyright (C) 2012  Edwin Woudt <edwin@woudt.nl>
+#
+# pyRFXtrx is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyRFXtrx is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pyRFXtrx.  See the file COPYING.txt in the distribution.
+# If not, see <http://www.gnu.org/licenses/>.
+"""
+Measure how many lighting commands per second can be encoded, either by
+building a packet with set_transmit() for each command, or by adding all
+commands of a scene to a lowlevel.TransmitBuffer.
+"""
+
+from timeit import repeat
+
+from RFXtrx import lowlevel
+
+COMMANDS = [
+    (lowlevel.Lighting1, (0x01, 0x00, 0x43, 0x05, 0x01)),
+    (lowlevel.Lighting2, (0x00, 0x00, 0x1234567, 0x05, 0x02, 0x08)),
+    (lowlevel.Lighting3, (0x00, 0x00, 0x01, 0x0234, 0x15)),
+    (lowlevel.Lighting4, (0x00, 0x00, 0x123456, 0x015e)),
+    (lowlevel.Lighting5, (0x00, 0x00, 0x123456, 0x07, 0x10, 0x11)),
+    (lowlevel.Lighting6, (0x00, 0x00, 0x1234, 0x41, 0x05, 0x03, 0x01)),
+] * 50
+
+NUMBER = 100
+REPEAT = 5
+
+
+def encode_packets():
+    """ Encode the commands into one packet object each """
+    result = bytearray()
+    for cls, args in COMMANDS:
+        pkt = cls()
+        pkt.set_transmit(*args)
+        result.extend(pkt.data)
+    return result
+
+
+def encode_buffer(buf):
+    """ Encode the commands into a reused TransmitBuffer """
+    buf.clear()
+    for cls, args in COMMANDS:
+        buf.add(cls, *args)
+    return buf.getvalue()
+
+
+def main():
+    """ Print the encode rates """
+    buf = lowlevel.TransmitBuffer()
+    assert encode_packets() == encode_buffer(buf)
+    count = NUMBER * len(COMMANDS)
+    print("{0:<15} {1:>12}".format('commands/sec', ''))
+    for name, func in [('set_transmit', encode_packets),
+                       ('TransmitBuffer', lambda: encode_buffer(buf))]:
+        elapsed = min(repeat(func, number=NUMBER, repeat=REPEAT))
+        print("{0:<15} {1:>12.0f}".format(name, count / elapsed))
+
+
+if __name__ == '__main__':
+    main()
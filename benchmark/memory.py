@@ -0,0 +1,66 @@
+# This file is part of pyRFXtrx, a Python library to communicate with
+# the RFXtrx family of devices from http://www.rfxcom.com/
+# See https://github.com/woudt/pyRFXtrx for the latest version.
+#
+# Copyright (C) 2012  Edwin Woudt <edwin@woudt.nl>
+#
+# pyRFXtrx is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyRFXtrx is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pyRFXtrx.  See the file COPYING.txt in the distribution.
+# If not, see <http://www.gnu.org/licenses/>.
+"""
+Measure how many bytes each decoded packet, and the device built from it,
+keeps alive. The frame bytearray itself is shared and not counted.
+"""
+
+import gc
+import tracemalloc
+
+from RFXtrx import lowlevel, LightingDevice, RFXtrxDevice
+
+from decode import FRAMES
+
+COUNT = 10000
+
+
+def _measure(factory):
+    """ Return the average number of bytes allocated per object that is
+        returned by factory and kept alive
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory() for _ in range(COUNT)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # leave out the list holding the objects
+    return (after - before - len(objects) * 8) // COUNT
+
+
+def main():
+    """ Print the memory use per object for every frame in FRAMES """
+    print("{0:<15} {1:>12} {2:>12}".format('bytes/object', 'packet',
+                                            'device'))
+    for name, frame in FRAMES:
+        data = bytearray(frame)
+        pkt = lowlevel.parse(data)
+        if name.startswith('Lighting') and name != 'Lighting4':
+            device = LightingDevice
+        else:
+            device = RFXtrxDevice
+        print("{0:<15} {1:>12} {2:>12}".format(
+            name, _measure(lambda: lowlevel.parse(data)),
+            _measure(lambda: device(pkt))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+# This file is part of pyRFXtrx, a Python library to communicate with
+# the RFXtrx family of devices from http://www.rfxcom.com/
+# See https://github.com/woudt/pyRFXtrx for the latest version.
+#
+# Copyright (C) 2012  Edwin Woudt <edwin@woudt.nl>
+#
+# pyRFXtrx is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyRFXtrx is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pyRFXtrx.  See the file COPYING.txt in the distribution.
+# If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+
+from RFXtrx.asyncioserial import AsyncioSerialTransport
+
+
+async def main():
+    transport = AsyncioSerialTransport('/dev/cu.usbserial-05VN8GHS',
+                                       debug=True)
+    await transport.connect()
+    print(await transport.reset())
+
+    async for event in transport.events():
+        print(event)
+
+asyncio.get_event_loop().run_until_complete(main())
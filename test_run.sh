@@ -2,7 +2,19 @@
 
 python -m doctest -v doctest/lighting.txt
 python -m doctest -v doctest/lowlevel.txt
+python -m doctest -v doctest/batch.txt
+python -m doctest -v doctest/asyncioserial.txt
+python -m doctest -v doctest/pyserial.txt
+python -m doctest -v doctest/twistedserial.txt
+python -m doctest -v doctest/tcp.txt
+python -m doctest -v doctest/aggregate.txt
 
 # run all again without the -v verbose options, to show all errors at the end
 python -m doctest doctest/lighting.txt
 python -m doctest doctest/lowlevel.txt
+python -m doctest doctest/batch.txt
+python -m doctest doctest/asyncioserial.txt
+python -m doctest doctest/pyserial.txt
+python -m doctest doctest/twistedserial.txt
+python -m doctest doctest/tcp.txt
+python -m doctest doctest/aggregate.txt